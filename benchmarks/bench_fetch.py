@@ -0,0 +1,40 @@
+from gie import GieRawClient, StubServer
+
+
+class FetchSuite:
+    """
+    Paged fetching against a local stub of the api with a fixed latency per request,
+    2011 till 2020 is 13 pages for one country.
+    """
+    params = [1, 4, 16]
+    param_names = ['max_workers']
+    latency = 0.02
+
+    def setup(self, max_workers):
+        self.server = StubServer(latency=self.latency).start()
+        self.client = GieRawClient('bench', max_workers=max_workers, endpoints=self.server.endpoints)
+
+    def teardown(self, max_workers):
+        self.server.stop()
+
+    def time_query_gas_country(self, max_workers):
+        self.client.query_gas_country('NL', start='2011-01-01', end='2020-12-31')
+
+    def time_query_gas_storages(self, max_workers):
+        self.client.query_gas_storages(['ugs_norg_langelo', 'ugs_grijpskerk', 'ugs_alkmaar', 'ugs_bergermeer'],
+                                       start='2018-01-01', end='2020-12-31')
+
+
+class RetrySuite:
+    """
+    Fetching while a tenth of the requests fail with a server error and have to be retried.
+    """
+    def setup(self):
+        self.server = StubServer(latency=0.02, error_rate=0.1, error_status=503, seed=1).start()
+        self.client = GieRawClient('bench', max_workers=4, endpoints=self.server.endpoints)
+
+    def teardown(self):
+        self.server.stop()
+
+    def time_query_gas_country(self):
+        self.client.query_gas_country('NL', start='2011-01-01', end='2020-12-31')
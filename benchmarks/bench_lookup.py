@@ -0,0 +1,31 @@
+from gie.agsi_mappings import AGSIStorage, lookup_country, lookup_storage
+from gie.alsi_mappings import lookup_terminal
+
+
+class LookupSuite:
+    """
+    Resolving user input to enum members, done for every query.
+    """
+    def time_country_code(self):
+        lookup_country('NL')
+
+    def time_storage_member(self):
+        lookup_storage(AGSIStorage.ugs_norg_langelo)
+
+    def time_storage_code(self):
+        lookup_storage(AGSIStorage.ugs_norg_langelo.code)
+
+    def time_storage_name(self):
+        lookup_storage('ugs_norg_langelo')
+
+    def time_storage_normalized_name(self):
+        lookup_storage('UGS Norg Langelo')
+
+    def time_terminal_name(self):
+        lookup_terminal('zeebrugge')
+
+    def time_storage_miss(self):
+        try:
+            lookup_storage('does not exist')
+        except ValueError:
+            pass
@@ -0,0 +1,26 @@
+from gie import GiePandasClient
+from gie.gie import APIType
+from .common import synthetic_records
+
+
+class ParseSuite:
+    """
+    Turning api records into a dataframe, for both record shapes.
+    """
+    params = (['AGSI', 'ALSI'], [1_000, 10_000, 100_000, 1_000_000])
+    param_names = ['api', 'rows']
+    timeout = 300
+
+    def setup(self, api, rows):
+        self.t = APIType[api]
+        self.data = synthetic_records(self.t, rows)
+
+    def time_fix_dataframe(self, api, rows):
+        GiePandasClient._fix_dataframe(self.data, t=self.t)
+
+    def peakmem_fix_dataframe(self, api, rows):
+        GiePandasClient._fix_dataframe(self.data, t=self.t)
+
+    def track_dataframe_bytes(self, api, rows):
+        return int(GiePandasClient._fix_dataframe(self.data, t=self.t).memory_usage(deep=True).sum())
+    track_dataframe_bytes.unit = 'bytes'
@@ -1,6 +1,29 @@
 from .gie import GieRawClient, GiePandasClient
+from .arrow import GieArrowClient
+from .cache import GieCache, PageCache
+from .cassette import CassetteAdapter
+from .catalogue import Catalogue
+from .instrumentation import Instrumentation, MetricsCollector
+from .ratelimit import TokenBucket
+from .store import GieStore
+from .stub import StubServer
+from .sync import GieSync
+from .gie_async import AsyncGieRawClient, AsyncGiePandasClient
 
 __all__ = [
     "GieRawClient",
     "GiePandasClient",
+    "AsyncGieRawClient",
+    "AsyncGiePandasClient",
+    "GieArrowClient",
+    "GieCache",
+    "PageCache",
+    "Catalogue",
+    "GieSync",
+    "GieStore",
+    "TokenBucket",
+    "Instrumentation",
+    "MetricsCollector",
+    "CassetteAdapter",
+    "StubServer",
 ]
@@ -0,0 +1,147 @@
+"""
+Aggregations of the long format dataframes of the bulk queries (code, gasDayStart index), for example
+GiePandasClient.query_gas_storages, up the facility hierarchy and over time.
+"""
+import numpy as np
+import pandas as pd
+from .hierarchy import facility_parents
+from .schemas import STATUS_DTYPE
+
+# daily volumes that add up over time, the other columns are levels or capacities
+FLOW_COLUMNS = ['injection', 'withdrawal', 'netWithdrawal', 'consumption', 'consumptionFull', 'sendOut']
+# percentages that do not add up over facilities, recomputed from the summed columns
+RATIO_COLUMNS = ['full', 'trend']
+
+
+def _parent_codes(codes: pd.Index, level: str, parents: dict | None) -> np.ndarray:
+    """
+    :return: for every row the code of its company, lso or country
+    """
+    mapping = facility_parents() | (parents or {})
+    # only the distinct facility codes go through the dict, the rows are mapped with their integer codes
+    positions, uniques = pd.factorize(codes)
+    unknown = [x for x in uniques if x not in mapping]
+    if len(unknown):
+        raise ValueError(f'Unknown facilities {unknown}, pass their company and country in parents')
+    k = 1 if level == 'country' else 0
+    return np.array([mapping[x][k] for x in uniques], dtype=object)[positions]
+
+
+def rollup(df: pd.DataFrame, level: str = 'country', parents: dict | None = None) -> pd.DataFrame:
+    """
+    Sum facility level data up to company, lso or country level in one groupby over the long format frame.
+    The fill level is recomputed from the summed gas in storage and working gas volume, trend from the fill
+    level of the day before. Status is E if any facility of the group is estimated, updatedAt is the latest one.
+
+    :param df: long format frame with facilities, as returned by query_gas_storages or query_lng_terminals
+    :param level: company (lso for terminals) or country
+    :param parents: optional code -> (company or lso code, country code) for facilities that are not in the mappings
+    :return: long format frame with the company, lso or country code as first index level and the number
+        of facilities that had data in a facilities column
+    """
+    if level not in ['company', 'lso', 'country']:
+        raise ValueError(f'level should be company, lso or country, not {level!r}')
+    if len(df) == 0:
+        return df
+    codes = _parent_codes(df.index.get_level_values('code'), level, parents)
+    keys = [pd.Index(codes, name=level), df.index.get_level_values('gasDayStart')]
+
+    numeric = [c for c in df.columns if c not in RATIO_COLUMNS + ['status', 'updatedAt']]
+    columns = {c: df[c] for c in numeric}
+    if 'status' in df:
+        columns['status'] = df['status'].cat.codes
+    if 'updatedAt' in df:
+        columns['updatedAt'] = df['updatedAt']
+    frame = pd.DataFrame(columns, index=df.index, copy=False)
+
+    # one grouper, the group keys are only factorized once for all aggregations
+    groups = frame.groupby(keys, sort=True)
+    result = groups[numeric].sum(min_count=1)
+    if 'full' in df and 'gasInStorage' in result and 'workingGasVolume' in result:
+        result['full'] = result['gasInStorage'] / result['workingGasVolume'].replace(0, np.nan) * 100
+        if 'trend' in df:
+            result['trend'] = result['full'].groupby(level=0).diff()
+    if 'status' in df:
+        result['status'] = pd.Categorical.from_codes(groups['status'].max().to_numpy(), dtype=STATUS_DTYPE)
+    if 'updatedAt' in df:
+        result['updatedAt'] = groups['updatedAt'].max()
+    result['facilities'] = groups.size()
+
+    # most recent gas day first, like the api
+    return result.sort_index(level=[0, 1], ascending=[True, False])
+
+
+def resample(df: pd.DataFrame, freq: str = 'W', levels: str = 'last') -> pd.DataFrame:
+    """
+    Resample per entity to a lower frequency. Flows (injection, withdrawal, send out) are summed,
+    levels and capacities take the last or mean value of the period.
+
+    :param df: frame of one entity or long format frame of many, with the entity as first index level
+    :param freq: pandas frequency, for example 'W', 'MS' or 'QS'
+    :param levels: last or mean
+    """
+    if levels not in ['last', 'mean']:
+        raise ValueError(f'levels should be last or mean, not {levels!r}')
+    numeric = [c for c in df.columns if c not in ['status', 'updatedAt']]
+    by = [pd.Grouper(level='gasDayStart', freq=freq)]
+    if isinstance(df.index, pd.MultiIndex):
+        by = [pd.Grouper(level=0)] + by
+    # last has to be the most recent gas day of the period
+    groups = df[numeric].sort_index().groupby(by)
+
+    flows = [c for c in numeric if c in FLOW_COLUMNS]
+    result = getattr(groups, levels)()
+    if len(flows):
+        result[flows] = groups[flows].sum(min_count=1)
+    return result.sort_index(ascending=False) if result.index.nlevels == 1 else \
+        result.sort_index(level=[0, 1], ascending=[True, False])
+
+
+def _day_of_year(index: pd.DatetimeIndex) -> np.ndarray:
+    # on a leap year calendar, so the same date has the same day of year in every year
+    return index.dayofyear + ((~index.is_leap_year) & (index.month > 2))
+
+
+def seasonal_profile(df: pd.DataFrame | pd.Series, column: str = 'full') -> pd.DataFrame:
+    """
+    :param df: frame or series of one entity
+    :param column: column of the frame to profile
+    :return: frame with the day of year (1-366, Feb 29 is day 60 in every year) as index and a column per year,
+        the bands of other years follow from for example profile.drop(columns=2022).agg(['min', 'max'], axis=1)
+    """
+    series = df if isinstance(df, pd.Series) else df[column]
+    index = series.index
+    profile = pd.Series(series.to_numpy(), index=pd.MultiIndex.from_arrays(
+        [_day_of_year(index), index.year], names=['dayOfYear', 'year']
+    )).unstack('year')
+    return profile.reindex(pd.RangeIndex(1, 367, name='dayOfYear'))
+
+
+def yoy(df: pd.DataFrame, columns: list[str] | None = None, pct: bool = False, years: int = 1) -> pd.DataFrame:
+    """
+    Year over year change of every gas day compared to the same gas day a number of years before.
+
+    :param df: frame of one entity or long format frame of many, with the entity as first index level
+    :param columns: columns to compare, defaults to all numeric ones
+    :param pct: relative change in percent instead of the difference
+    :param years: how many years to look back
+    """
+    if columns is None:
+        columns = [c for c in df.columns if c not in ['status', 'updatedAt']]
+    current = df[columns]
+    # move the earlier year onto the dates it is compared with, Feb 29 has no counterpart
+    previous = current.copy()
+    if isinstance(df.index, pd.MultiIndex):
+        days = df.index.get_level_values('gasDayStart')
+        previous.index = pd.MultiIndex.from_arrays(
+            [df.index.get_level_values(0), days + pd.DateOffset(years=years)], names=df.index.names
+        )
+        leap_days = (days.month == 2) & (days.day == 29)
+    else:
+        previous.index = df.index + pd.DateOffset(years=years)
+        leap_days = (df.index.month == 2) & (df.index.day == 29)
+    previous = previous[~leap_days].reindex(current.index)
+
+    if pct:
+        return (current - previous) / previous.abs().replace(0, np.nan) * 100
+    return current - previous
@@ -1,53 +1,30 @@
 import enum
 from typing import Union
+from .lookup import lookup_member
 
 
 def lookup_lso(s: Union['ALSILSO', str]) -> 'ALSILSO':
     if isinstance(s, ALSILSO):
         # If it already is an ASGICompany object, we're happy
         return s
-    # It is a string
-    try:
-        # do lookup
-        return ALSILSO[s]
-    except KeyError:
-        # It is not, it may be a direct code
-        try:
-            return [obj for obj in ALSILSO if obj.value == s][0]
-        except IndexError:
-            raise ValueError('Invalid lso string')
+    # It is a string, look it up by name, code or full name
+    return lookup_member(ALSILSO, s, 'lso')
 
 
 def lookup_terminal(s: Union['ALSITerminal', str]) -> 'ALSITerminal':
     if isinstance(s, ALSITerminal):
         # If it already is an ASGICompany object, we're happy
         return s
-    # It is a string
-    try:
-        # do lookup
-        return ALSITerminal[s]
-    except KeyError:
-        # It is not, it may be a direct code
-        try:
-            return [obj for obj in ALSITerminal if obj.value == s][0]
-        except IndexError:
-            raise ValueError('Invalid terminal string')
+    # It is a string, look it up by name, code or full name
+    return lookup_member(ALSITerminal, s, 'terminal')
 
 
 def lookup_country(s: Union['ALSICountry', str]) -> 'ALSICountry':
     if isinstance(s, ALSICountry):
         # If it already is an AGSICountry object, we're happy
         return s
-    # It is a string
-    try:
-        # do lookup
-        return ALSICountry[s]
-    except KeyError:
-        # It is not, it may be a direct code
-        try:
-            return [obj for obj in ALSICountry if obj.value == s][0]
-        except IndexError:
-            raise ValueError('Invalid country string')
+    # It is a string, look it up by name, code or full name
+    return lookup_member(ALSICountry, s, 'country')
 
 
 class ALSICountry(enum.Enum):
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from .agsi_mappings import AGSICompany, AGSIStorage, AGSICountry
+from .alsi_mappings import ALSITerminal, ALSILSO, ALSICountry
+from .gie import APIType, GieRawClient, SCHEMAS, api_type, parse_records
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+
+
+def records_to_table(data: list[dict], t: APIType | None = None) -> 'pa.Table':
+    """
+    Build an arrow table straight from api records, the numeric columns are handed to arrow without a copy.
+    Columns and types follow the same schema as the dataframes of GiePandasClient.
+    """
+    t, gas_days, columns, status, updated_at = parse_records(data, t)
+    arrays = {'gasDayStart': pa.array(np.array(gas_days, dtype='datetime64[D]').astype('datetime64[ns]'))}
+    for c, values in columns.items():
+        arrays[c] = pa.array(values)
+    arrays['status'] = pa.DictionaryArray.from_arrays(
+        pa.array(pd.Categorical(status, dtype=SCHEMAS[t]['status']).codes, type=pa.int8()),
+        pa.array(SCHEMAS[t]['status'].categories.to_list())
+    )
+    arrays['updatedAt'] = pa.array(pd.to_datetime(updated_at).astype(SCHEMAS[t]['updatedAt']).to_numpy())
+    return pa.table(arrays)
+
+
+class GieArrowClient(GieRawClient):
+    """
+    Client that returns pyarrow tables instead of dataframes and can write parquet datasets partitioned by
+    entity code and year directly from the api records.
+    """
+
+    def __init__(self, api_key, **kwargs):
+        if pa is None:
+            raise ImportError('GieArrowClient requires pyarrow, install it with pip install gie-py[arrow]')
+        super().__init__(api_key, **kwargs)
+
+    def query_gas_storage(self, storage: AGSIStorage | str,
+                          start: pd.Timestamp | str, end: pd.Timestamp | str) -> 'pa.Table':
+        return records_to_table(
+            super().query_gas_storage(storage=storage, start=start, end=end),
+            t=APIType.AGSI
+        )
+
+    def query_gas_company(self, company: AGSICompany | str,
+                          start: pd.Timestamp | str, end: pd.Timestamp | str) -> 'pa.Table':
+        return records_to_table(
+            super().query_gas_company(company=company, start=start, end=end),
+            t=APIType.AGSI
+        )
+
+    def query_gas_country(self, country: AGSICountry | str,
+                          start: pd.Timestamp | str, end: pd.Timestamp | str) -> 'pa.Table':
+        return records_to_table(
+            super().query_gas_country(country=country, start=start, end=end),
+            t=APIType.AGSI
+        )
+
+    def query_lng_terminal(self, terminal: ALSITerminal | str,
+                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> 'pa.Table':
+        return records_to_table(
+            super().query_lng_terminal(terminal=terminal, start=start, end=end),
+            t=APIType.ALSI
+        )
+
+    def query_lng_lso(self, lso: ALSILSO | str,
+                      start: pd.Timestamp | str, end: pd.Timestamp | str) -> 'pa.Table':
+        return records_to_table(
+            super().query_lng_lso(lso=lso, start=start, end=end),
+            t=APIType.ALSI
+        )
+
+    def query_lng_country(self, country: ALSICountry | str,
+                          start: pd.Timestamp | str, end: pd.Timestamp | str) -> 'pa.Table':
+        return records_to_table(
+            super().query_lng_country(country=country, start=start, end=end),
+            t=APIType.ALSI
+        )
+
+    def write_parquet(self, entities: list, root: str,
+                      start: pd.Timestamp | str, end: pd.Timestamp | str) -> dict:
+        """
+        Fetch the entities through the shared worker pool and write them as a parquet dataset partitioned
+        by entity code and year (root/code=.../year=.../*.parquet). Partitions that are written again are replaced.
+
+        :param entities: list of enum members from the mappings, agsi and alsi can be mixed
+        :return: dict entity -> exception for the entities that failed
+        """
+        if type(start) is not pd.Timestamp:
+            start = pd.Timestamp(start)
+        if type(end) is not pd.Timestamp:
+            end = pd.Timestamp(end)
+
+        results = self._fetch_many([(x, api_type(x), start, end) for x in entities])
+        errors = {}
+        for entity, data in zip(entities, results):
+            if isinstance(data, Exception):
+                errors[entity] = data
+                continue
+            table = records_to_table(data, t=api_type(entity))
+            table = table.append_column('code', pa.array([entity.code] * len(table)))
+            table = table.append_column('year', pc.year(table['gasDayStart']))
+            ds.write_dataset(table, root, format='parquet',
+                             partitioning=['code', 'year'], partitioning_flavor='hive',
+                             basename_template=f'{api_type(entity).name.lower()}-{{i}}.parquet',
+                             existing_data_behavior='delete_matching')
+        return errors
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import pandas as pd
+
+
+class GieCache:
+    """
+    Persistent on disk cache of api records, stored per api type, entity and gas day in a sqlite database.
+
+    Gas days older than the revision window of the api are considered final and never refetched,
+    more recent gas days are refetched once they are older than the ttl.
+    Gas days for which the api returned nothing are cached as well so they are not requested over and over.
+    """
+
+    def __init__(self, path: str | None = None, ttl: pd.Timedelta | str = '1h',
+                 revision_window: pd.Timedelta | str = '30D', max_size: int | None = 1_000_000):
+        """
+        :param path: location of the sqlite database, defaults to ~/.cache/gie-py/cache.sqlite
+        :param ttl: how long gas days inside the revision window are considered fresh
+        :param revision_window: gas days older than this are considered immutable
+        :param max_size: maximum number of gas day records to keep, least recently used ones are evicted first
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'gie-py', 'cache.sqlite')
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.ttl = pd.Timedelta(ttl).total_seconds()
+        self.revision_window = pd.Timedelta(revision_window)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS records (
+                api TEXT NOT NULL,
+                entity TEXT NOT NULL,
+                gas_day TEXT NOT NULL,
+                payload TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (api, entity, gas_day)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS records_accessed_at ON records (accessed_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def _key(t, obj) -> tuple[str, str]:
+        return t.name, json.dumps(obj.get_params(), sort_keys=True)
+
+    def _is_fresh(self, gas_day: str, fetched_at: float, now: float, immutable_before: str) -> bool:
+        # gas days are iso formatted so they can be compared as strings
+        return gas_day < immutable_before or now - fetched_at < self.ttl
+
+    def lookup(self, t, obj, start: pd.Timestamp, end: pd.Timestamp) \
+            -> tuple[dict[str, dict | None], tuple[pd.Timestamp, pd.Timestamp] | None]:
+        """
+        Look up the gas days from start to end.
+
+        :return: tuple of the fresh cached gas days (gas day -> record or None if the api had no data)
+            and the span of gas days that still has to be fetched, None if everything is cached
+        """
+        days = pd.date_range(start.normalize(), end.normalize()).strftime('%Y-%m-%d')
+        if len(days) == 0:
+            # start after end, nothing to look up or fetch
+            return {}, None
+        now = time.time()
+        immutable_before = (pd.Timestamp.now().normalize() - self.revision_window).strftime('%Y-%m-%d')
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT gas_day, payload, fetched_at FROM records '
+                'WHERE api = ? AND entity = ? AND gas_day BETWEEN ? AND ?',
+                self._key(t, obj) + (days[0], days[-1])
+            ).fetchall()
+        cached = {
+            gas_day: None if payload is None else json.loads(payload)
+            for gas_day, payload, fetched_at in rows if self._is_fresh(gas_day, fetched_at, now, immutable_before)
+        }
+        missing = [day for day in days if day not in cached]
+
+        with self._lock:
+            self.hits += len(days) - len(missing)
+            self.misses += len(missing)
+            self._conn.executemany(
+                'UPDATE records SET accessed_at = ? WHERE api = ? AND entity = ? AND gas_day = ?',
+                [(now,) + self._key(t, obj) + (day,) for day in cached]
+            )
+            self._conn.commit()
+
+        if len(missing) == 0:
+            return cached, None
+        return cached, (pd.Timestamp(missing[0]), pd.Timestamp(missing[-1]))
+
+    def store(self, t, obj, start: pd.Timestamp, end: pd.Timestamp, data: list[dict]):
+        """
+        Store the records returned by the api for the gas days from start to end,
+        gas days without a record are stored as empty.
+        """
+        records = {x['gasDayStart']: x for x in data}
+        now = time.time()
+        rows = [
+            self._key(t, obj) + (day, json.dumps(records[day]) if day in records else None, now, now)
+            for day in pd.date_range(start.normalize(), end.normalize()).strftime('%Y-%m-%d')
+        ]
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)', rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+        size = self._conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+        if size > self.max_size:
+            self._conn.execute(
+                'DELETE FROM records WHERE rowid IN '
+                '(SELECT rowid FROM records ORDER BY accessed_at LIMIT ?)',
+                (size - self.max_size,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM records')
+            self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': size
+        }
+
+
+class PageCache:
+    """
+    Persistent on disk cache of raw api pages with their ETag and Last-Modified validators, keyed by request url,
+    in a sqlite database. Pages are requested again every time, but conditionally: when the api answers
+    304 Not Modified the stored page is used and nothing is downloaded, the stored page is still decoded.
+    When the api does not send validators pages are downloaded and decoded as usual, a hash of the body only
+    tells whether the page changed so unchanged pages are counted and not written again.
+    """
+
+    def __init__(self, path: str | None = None, max_size: int | None = 100_000):
+        """
+        :param path: location of the sqlite database, defaults to ~/.cache/gie-py/pages.sqlite
+        :param max_size: maximum number of pages to keep, least recently used ones are evicted first
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'gie-py', 'pages.sqlite')
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_size = max_size
+        # pages served from the cache after a 304, pages downloaded again and downloaded pages that had not changed
+        self.not_modified = 0
+        self.misses = 0
+        self.unchanged = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                digest BLOB NOT NULL,
+                body BLOB NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)')
+        self._conn.commit()
+
+    def lookup(self, url: str) -> tuple[dict, bytes | None]:
+        """
+        :return: tuple of the conditional request headers for this url and the stored page,
+            no headers and None if the page is not cached or was stored without validators
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, body FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None or (row[0] is None and row[1] is None):
+            return {}, None
+        etag, last_modified, body = row
+        headers = {}
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        if last_modified is not None:
+            headers['If-Modified-Since'] = last_modified
+        return headers, zlib.decompress(body)
+
+    def not_modified_hit(self, url: str):
+        """
+        Register that the api answered 304 for the page of this url.
+        """
+        with self._lock:
+            self.not_modified += 1
+            self._conn.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+
+    def store(self, url: str, body: bytes, etag: str | None = None, last_modified: str | None = None) -> bool:
+        """
+        Store a page that was downloaded from the api with the validators from its response headers.
+
+        :return: True if the page was already stored with the same body
+        """
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            row = self._conn.execute('SELECT digest FROM pages WHERE url = ?', (url,)).fetchone()
+            unchanged = row is not None and row[0] == digest
+            if unchanged:
+                self.unchanged += 1
+                self._conn.execute(
+                    'UPDATE pages SET etag = ?, last_modified = ?, accessed_at = ? WHERE url = ?',
+                    (etag, last_modified, now, url)
+                )
+            else:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                    (url, etag, last_modified, digest, zlib.compress(body), now)
+                )
+                self._evict()
+            self._conn.commit()
+        return unchanged
+
+    def _evict(self):
+        if self.max_size is None:
+            return
+        size = self._conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+        if size > self.max_size:
+            self._conn.execute(
+                'DELETE FROM pages WHERE rowid IN '
+                '(SELECT rowid FROM pages ORDER BY accessed_at LIMIT ?)',
+                (size - self.max_size,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM pages')
+            self._conn.commit()
+        self.not_modified = 0
+        self.misses = 0
+        self.unchanged = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+        return {
+            'not_modified': self.not_modified,
+            'misses': self.misses,
+            'unchanged': self.unchanged,
+            'size': size
+        }
@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from urllib3 import HTTPResponse
+from .exceptions import CassetteMissError
+from .transport import PoolAdapter
+
+# headers that describe the encoding on the wire, the body is stored decoded
+_SKIP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+
+class CassetteAdapter(PoolAdapter):
+    """
+    Transport adapter that replays api responses from a cassette file instead of going over the network.
+    In record mode requests that are not on the cassette yet are sent to the api and their responses are appended
+    to it, so a session against the live api can be replayed later, offline and deterministically.
+
+    Requests are matched on method and url with the query parameters sorted, request headers (so the api key)
+    are never written to the cassette.
+    """
+
+    def __init__(self, path: str, record: bool = False, **kwargs):
+        """
+        :param path: cassette file, one json line per response
+        :param record: send requests that are not on the cassette to the api and record them
+        :param kwargs: passed on to HTTPAdapter, for example max_retries for record mode
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self.record = record
+        self.interactions = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def _key(request) -> str:
+        url = urlsplit(request.url)
+        query = urlencode(sorted(parse_qsl(url.query)))
+        return f'{request.method} {url.scheme}://{url.netloc}{url.path}?{query}'
+
+    def load(self):
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    x = json.loads(line)
+                    self.interactions[x['request']] = (x['status'], x['headers'], x['body'].encode())
+
+    def _append(self, key: str, status: int, headers: dict, body: bytes):
+        with self._lock:
+            self.interactions[key] = (status, headers, body)
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # append only, rewriting the whole cassette on every page would be quadratic
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({
+                    'request': key, 'status': status, 'headers': headers, 'body': body.decode()
+                }, separators=(',', ':')) + '\n')
+
+    def send(self, request, **kwargs):
+        key = self._key(request)
+        interaction = self.interactions.get(key)
+        if interaction is None:
+            if not self.record:
+                raise CassetteMissError(f'{key} is not on cassette {self.path}')
+            r = super().send(request, **kwargs)
+            # throttling and server errors are transient, they should not end up in a replay, neither should
+            # a 304 that is only meaningful to the page cache of the client that sent the conditional request
+            if r.status_code not in (304, 429) and r.status_code < 500:
+                headers = {k: v for k, v in r.headers.items() if k.lower() not in _SKIP_HEADERS}
+                self._append(key, r.status_code, headers, r.content)
+            return r
+
+        status, headers, body = interaction
+        raw = HTTPResponse(body=io.BytesIO(body), headers=headers, status=status,
+                           preload_content=False, decode_content=False)
+        return self.build_response(request, raw)
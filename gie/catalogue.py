@@ -0,0 +1,158 @@
+import json
+import os
+import re
+from .agsi_mappings import lookup_company, lookup_storage
+from .alsi_mappings import lookup_terminal, lookup_lso
+from .lookup import normalize
+
+# kind of entity -> lookup in the built-in enums
+KINDS = {
+    'company': lookup_company,
+    'storage': lookup_storage,
+    'lso': lookup_lso,
+    'terminal': lookup_terminal,
+}
+
+
+class CatalogueEntry:
+    """
+    Company, storage, lso or terminal from the api listing that is not in the built-in enums.
+    Behaves like the enum members towards the clients.
+    """
+
+    def __init__(self, kind: str, code: str, country: str, name: str, company: str | None = None):
+        self.kind = kind
+        self.code = code
+        self.value = code
+        self.country = country
+        self.full_name = name
+        self.company = company
+        # same style as the enum member names
+        self.name = re.sub(r'[^0-9a-z]+', '_', name.lower()).strip('_')
+
+    def __str__(self):
+        return self.code
+
+    def __repr__(self):
+        return f'<CatalogueEntry.{self.kind}.{self.name}: {self.code!r}>'
+
+    def __eq__(self, other):
+        return isinstance(other, CatalogueEntry) and (self.kind, self.code) == (other.kind, other.code)
+
+    def __hash__(self):
+        return hash((self.kind, self.code))
+
+    def get_params(self):
+        if self.company is None:
+            return {
+                'country': self.country,
+                'company': self.code,
+            }
+        return {
+            'country': self.country,
+            'company': self.company,
+            'facility': self.code
+        }
+
+
+class Catalogue:
+    """
+    Catalogue of the companies and facilities known to the api, loaded from the api listing and persisted as a
+    local snapshot. Lookups try the built-in enums first and only fall back to the catalogue for entities that
+    are missing from them, so no network request is needed to resolve names on startup.
+    """
+
+    def __init__(self, path: str | None = None):
+        """
+        :param path: location of the snapshot, defaults to ~/.cache/gie-py/catalogue.json
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'gie-py', 'catalogue.json')
+        self.path = path
+        self.entries = {kind: [] for kind in KINDS}
+        self._index = {kind: {} for kind in KINDS}
+        if os.path.exists(path):
+            self.load()
+
+    def _set(self, kind: str, entries: list[CatalogueEntry]):
+        self.entries[kind] = entries
+        self._index[kind] = {}
+        for entry in entries:
+            self._add(entry)
+
+    def _add(self, entry: CatalogueEntry):
+        for key in [entry.code, entry.name, normalize(entry.code), normalize(entry.name), normalize(entry.full_name)]:
+            self._index[entry.kind].setdefault(key, entry)
+
+    def load(self):
+        with open(self.path) as f:
+            snapshot = json.load(f)
+        for kind, rows in snapshot.items():
+            self._set(kind, [CatalogueEntry(kind, *row) for row in rows])
+
+    def save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # compact rows instead of objects, the snapshot is read on every start
+        snapshot = {
+            kind: [[x.code, x.country, x.full_name] + ([] if x.company is None else [x.company]) for x in entries]
+            for kind, entries in self.entries.items()
+        }
+        with open(self.path, 'w') as f:
+            json.dump(snapshot, f, separators=(',', ':'))
+
+    def update(self, api: str, listing: dict | list):
+        """
+        Replace the entities of one api by the ones in its about?show=listing response and save the snapshot.
+
+        :param api: AGSI or ALSI
+        """
+        company_kind, facility_kind = ('company', 'storage') if api == 'AGSI' else ('lso', 'terminal')
+        entries = {company_kind: [], facility_kind: []}
+
+        def _country(x):
+            country = x.get('country')
+            return country.get('code') if isinstance(country, dict) else country
+
+        def _walk(x):
+            # the listing is nested by region and country, companies are the objects that have facilities
+            if isinstance(x, dict) and 'eic' in x and 'facilities' in x:
+                entries[company_kind].append(
+                    CatalogueEntry(company_kind, x['eic'], _country(x), x.get('short_name') or x['name'])
+                )
+                for facility in x['facilities']:
+                    entries[facility_kind].append(
+                        CatalogueEntry(facility_kind, facility['eic'], _country(facility) or _country(x),
+                                       facility['name'], company=x['eic'])
+                    )
+            elif isinstance(x, dict):
+                for y in x.values():
+                    _walk(y)
+            elif isinstance(x, list):
+                for y in x:
+                    _walk(y)
+
+        _walk(listing)
+        for kind, new in entries.items():
+            self._set(kind, new)
+        self.save()
+
+    def lookup(self, kind: str, s):
+        """
+        Look up an entity of the given kind (company, storage, lso or terminal) in the built-in enums,
+        falling back to the catalogue.
+        """
+        if isinstance(s, CatalogueEntry):
+            if s.kind != kind:
+                raise ValueError(f'Invalid {kind} string, {s!r} is a {s.kind}')
+            return s
+        try:
+            return KINDS[kind](s)
+        except ValueError:
+            if not isinstance(s, str):
+                raise
+            index = self._index[kind]
+            entry = index.get(s) or index.get(normalize(s))
+            if entry is None:
+                raise
+            return entry
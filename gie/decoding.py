@@ -0,0 +1,25 @@
+"""
+Json decoding of api responses, using the fastest decoder that is installed: orjson, msgspec or the standard library.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+if orjson is not None:
+    BACKEND = 'orjson'
+    loads = orjson.loads
+elif msgspec is not None:
+    BACKEND = 'msgspec'
+    loads = msgspec.json.Decoder().decode
+else:
+    BACKEND = 'json'
+    loads = json.loads
@@ -3,3 +3,6 @@ class NoMatchingDataError(Exception):
 
 class ApiError(Exception):
     pass
+
+class CassetteMissError(Exception):
+    pass
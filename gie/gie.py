@@ -1,12 +1,35 @@
+import math
+import multiprocessing
+import re
+import threading
+import time
+from urllib.parse import urlencode
 import requests
-from requests.adapters import HTTPAdapter, Retry
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from collections.abc import Callable, Iterator
+from typing import TYPE_CHECKING
+import numpy as np
 import pandas as pd
 from .agsi_mappings import AGSICompany, AGSIStorage, AGSICountry, lookup_company, lookup_storage, lookup_country
 from .alsi_mappings import ALSITerminal, ALSILSO, ALSICountry, lookup_terminal, lookup_lso, \
     lookup_country as lookup_country_alsi
 from .exceptions import *
+from .cache import GieCache, PageCache
+from .hierarchy import expand_facilities
+from .catalogue import Catalogue, CatalogueEntry
+from .ratelimit import TokenBucket
+from .cassette import CassetteAdapter
+from .transport import PoolAdapter, Http2Adapter, ServerRetry, parse_retry_after
+from .decoding import loads
+from .instrumentation import Instrumentation, RequestEvent, FetchEvent, ParseEvent
+from .schemas import AGSI_SCHEMA, ALSI_SCHEMA, DATETIME_DTYPE
+from .panel import GiePanel
 from enum import Enum
 
+if TYPE_CHECKING:
+    from .store import GieStore
+
 __title__ = "gie-py"
 __version__ = "0.4.6"
 __author__ = "Frank Boerman"
@@ -18,56 +41,596 @@ class APIType(str, Enum):
     ALSI = "https://alsi.gie.eu/api"
 
 
+SCHEMAS = {
+    APIType.AGSI: AGSI_SCHEMA,
+    APIType.ALSI: ALSI_SCHEMA,
+}
+
+# last_page of a response without decoding the records, pages that are parsed in another process
+_LAST_PAGE = re.compile(rb'"last_page"\s*:\s*(\d+)')
+
+
+def api_type(entity) -> APIType:
+    """
+    :return: the api an entity (enum member of one of the mappings) belongs to
+    """
+    if isinstance(entity, AGSICountry | AGSICompany | AGSIStorage):
+        return APIType.AGSI
+    if isinstance(entity, ALSICountry | ALSILSO | ALSITerminal):
+        return APIType.ALSI
+    if isinstance(entity, CatalogueEntry) and entity.kind in ['company', 'storage']:
+        return APIType.AGSI
+    if isinstance(entity, CatalogueEntry) and entity.kind in ['lso', 'terminal']:
+        return APIType.ALSI
+    raise ValueError(f'{entity!r} is not an entity of the mappings or catalogue, look it up first')
+
+
+def _to_numeric(values: list, dtype=None) -> np.ndarray | list:
+    try:
+        # fast path, the api returns numbers as decimal strings and '-' for missing
+        return np.array([0.0 if x == '-' else float(x) for x in values], dtype=dtype)
+    except (TypeError, ValueError):
+        pass
+    if dtype is not None:
+        # a declared column always gets its dtype, values that are not numbers become NaN
+        return pd.to_numeric(pd.Series(values, dtype=object).replace('-', 0), errors='coerce') \
+            .to_numpy(dtype=dtype)
+    try:
+        return pd.to_numeric(pd.Series(values, dtype=object).replace('-', 0).infer_objects()).to_numpy()
+    except ValueError:
+        return values
+
+
+def parse_records(data: list[dict], t: APIType | None = None) \
+        -> tuple[APIType, list[str], dict[str, np.ndarray], list[str], list[str]]:
+    """
+    Turn api records into columns following the schema of the api, the shared first step of every
+    tabular output format. Records with status N (no data) are dropped.
+
+    :param t: api the records came from, inferred from the fields if not given
+    :return: tuple of api type, gas days, numeric columns, status and updatedAt
+    """
+    # records nearly always share the same fields, so collect the distinct field tuples first
+    keys = dict.fromkeys(k for fields in dict.fromkeys(tuple(x) for x in data) for k in fields)
+    if t is None:
+        t = APIType.ALSI if 'sendOut' in keys else APIType.AGSI
+    schema = SCHEMAS[t]
+    data = [x for x in data if x['status'] != 'N']
+
+    columns = {}
+    # first all the columns of the schema, then any field the api added that is not in the schema yet
+    for c in list(schema) + [k for k in keys if k not in schema]:
+        if c in ['name', 'code', 'url', 'info', 'type', 'gasDayStart', 'status', 'updatedAt']:
+            continue
+        if c not in keys:
+            columns[c] = np.full(len(data), np.nan, dtype=schema[c])
+            continue
+        values = [x.get(c) for x in data]
+        if c in ['inventory', 'dtmi']:
+            # given per unit, only keep the lng volume
+            values = [None if x is None else x['lng'] for x in values]
+        columns[c] = _to_numeric(values, dtype=schema.get(c))
+
+    return t, [x['gasDayStart'] for x in data], columns, [x['status'] for x in data], [x['updatedAt'] for x in data]
+
+
 class GieRawClient:
-    def __init__(self, api_key):
+    # page sizes tried from large to small with page_size='auto'
+    AUTO_PAGE_SIZES = [3000, 1000, 300]
+    # seconds after which a page is considered slow and the next jobs use a smaller page size
+    AUTO_SLOW_PAGE = 10.0
+    # how many times a request the api throttled with 429 is retried
+    THROTTLE_RETRIES = 5
+
+    def __init__(self, api_key, max_workers: int = 4, cache: GieCache | None = None,
+                 window: str | None = None, window_retries: int = 2, catalogue: Catalogue | None = None,
+                 rate_limit: TokenBucket | None = None, instrumentation: Instrumentation | None = None,
+                 endpoints: dict | None = None, page_size: int | str = 300,
+                 timeout: float | tuple[float, float] | None = (10, 60), pool_connections: int = 2,
+                 pool_maxsize: int | None = None, http2: bool = False, page_cache: PageCache | None = None):
+        """
+        :param api_key: api key for agsi.gie.eu / alsi.gie.eu
+        :param max_workers: maximum number of page requests in flight at the same time for one query
+        :param cache: optional on disk cache, when given gas days are only requested from the api if not cached
+        :param window: optional pandas frequency (for example 'YS' or 'QS') to split long date ranges into
+            windows that are fetched in parallel
+        :param window_retries: how many times a window that failed with a transient error is retried on its own,
+            only used together with window
+        :param catalogue: optional catalogue of entities from the api listing, used to resolve companies and
+            facilities that are missing from the built-in enums
+        :param rate_limit: optional token bucket every request of this client has to pass, can be shared
+            between clients and processes
+        :param instrumentation: optional hooks that get timings and sizes of every request, fetch and parse
+        :param endpoints: optional api type -> url overrides, for example the endpoints of a local StubServer
+        :param page_size: number of gas days per request, or 'auto' to use the largest size the api accepts
+            that keeps the pages fast, falling back to smaller pages when the api rejects or slows down
+        :param timeout: seconds to wait for a connection and for data of a response, None to wait forever
+        :param pool_connections: number of hosts to keep a connection pool for
+        :param pool_maxsize: connections kept open per host, defaults to max_workers
+        :param http2: multiplex the requests over one http/2 connection per host, requires httpx
+        :param page_cache: optional on disk cache of pages, when given pages are requested conditionally and
+            pages the api reports as not modified are not downloaded again
+        """
+        if page_size != 'auto' and not (isinstance(page_size, int) and page_size > 0):
+            raise ValueError(f'page_size should be a positive number or auto, not {page_size!r}')
+        self.max_workers = max_workers
+        self.cache = cache
+        self.window = window
+        self.window_retries = window_retries
+        self.catalogue = catalogue
+        self.rate_limit = rate_limit
+        self.instrumentation = instrumentation
+        self.page_cache = page_cache
+        self.endpoints = {t: t.value for t in APIType} | (endpoints or {})
+        self.page_size = page_size
+        # api type -> index in AUTO_PAGE_SIZES of the largest page size that is currently used
+        self._auto_level = {}
+        self._auto_lock = threading.Lock()
         self.s = requests.Session()
-        retries = Retry(total=5,
-                        backoff_factor=0.1,
-                        status_forcelist=[500, 502, 503, 504])
-        self.s.mount('http://', HTTPAdapter(max_retries=retries))
-        self.s.mount('https://', HTTPAdapter(max_retries=retries))
+        # 429 is retried by _fetch_page, so every attempt passes the rate limit
+        retries = ServerRetry(total=5,
+                              backoff_factor=0.1,
+                              status_forcelist=[500, 502, 503, 504],
+                              respect_retry_after_header=True)
+        # size the connection pool to the number of workers so concurrent pages do not have to reconnect
+        if pool_maxsize is None:
+            pool_maxsize = max_workers
+        if http2:
+            adapter = Http2Adapter(max_retries=retries, max_connections=pool_maxsize)
+        else:
+            adapter = PoolAdapter(max_retries=retries, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.timeout = timeout
+        self.s.mount('http://', adapter)
+        self.s.mount('https://', adapter)
         self.s.headers.update({
             'user-agent': f'gie-py v{__version__} (github.com/fboerman/gie-py)',
             'x-key': api_key
         })
 
-    def _fetch(self, obj, t: APIType,
-               start: pd.Timestamp | str, end: pd.Timestamp | str):
+    def connection_stats(self) -> dict:
+        """
+        :return: host -> number of connections opened, requests made over them and requests per connection
+        """
+        stats = {}
+        for adapter in {id(x): x for x in self.s.adapters.values()}.values():
+            if hasattr(adapter, 'stats'):
+                stats |= adapter.stats()
+        for x in stats.values():
+            x['reuse'] = x['requests'] / x['connections'] if x['connections'] else 0.0
+        return stats
+
+    def use_cassette(self, path: str, record: bool = False):
+        """
+        Replay responses from a cassette file instead of requesting them from the api.
+
+        :param path: cassette file
+        :param record: request what is not on the cassette from the api and add it to the cassette
+        """
+        adapter = CassetteAdapter(path, record=record, max_retries=self.s.get_adapter('https://').max_retries,
+                                  pool_maxsize=self.max_workers)
+        self.s.mount('http://', adapter)
+        self.s.mount('https://', adapter)
+
+    def _lookup(self, kind: str, s):
+        if self.catalogue is not None:
+            return self.catalogue.lookup(kind, s)
+        return {
+            'company': lookup_company,
+            'storage': lookup_storage,
+            'lso': lookup_lso,
+            'terminal': lookup_terminal,
+        }[kind](s)
+
+    def refresh_catalogue(self):
+        """
+        Load the listing of all companies and facilities from both apis into the catalogue and save its snapshot.
+        """
+        if self.catalogue is None:
+            self.catalogue = Catalogue()
+        for t in APIType:
+            if self.rate_limit is not None:
+                self.rate_limit.acquire()
+            r = self.s.get(self.endpoints[t] + '/about', params={'show': 'listing'}, timeout=self.timeout)
+            r.raise_for_status()
+            self.catalogue.update(t.name, loads(r.content))
+
+    def _page_size(self, t: APIType, start: pd.Timestamp, end: pd.Timestamp, limit: int | None = None) -> int:
+        """
+        :param limit: optional maximum page size for this job only
+        :return: page size for all pages of a job, with page_size='auto' the fewest pages the current maximum
+            allows, spread evenly over the pages
+        """
+        if self.page_size != 'auto':
+            return self.page_size
+        max_size = self.AUTO_PAGE_SIZES[self._auto_level.get(t, 0)]
+        if limit is not None:
+            max_size = min(max_size, limit)
+        days = max((end - start).days + 1, 1)
+        pages = math.ceil(days / max_size)
+        return math.ceil(days / pages)
+
+    def _smaller_page_size(self, size: int) -> int | None:
+        """
+        :return: the next page size of AUTO_PAGE_SIZES below size, None if there is none or page_size is fixed
+        """
+        if self.page_size != 'auto':
+            return None
+        return next((x for x in self.AUTO_PAGE_SIZES if x < size), None)
+
+    def _shrink_page_size(self, t: APIType, size: int) -> bool:
+        """
+        Use smaller pages than size for the next jobs of this api type.
+
+        :return: False if there is no smaller page size to fall back to
+        """
+        if self._smaller_page_size(size) is None:
+            return False
+        smaller = [level for level, x in enumerate(self.AUTO_PAGE_SIZES) if x < size]
+        with self._auto_lock:
+            self._auto_level[t] = max(smaller[0], self._auto_level.get(t, 0))
+        return True
+
+    def _fetch_page(self, obj, t: APIType,
+                    start: pd.Timestamp, end: pd.Timestamp, page: int = 1, size: int | None = None,
+                    decode: bool = True) -> dict:
+        """
+        :param decode: decode the response, otherwise only last_page is read and the body is returned as content
+        """
+        if size is None:
+            size = self._page_size(t, start, end)
+        params = {
+            'from': start.strftime('%Y-%m-%d'),
+            'till': end.strftime('%Y-%m-%d'),
+            'size': size,
+            'page': page
+        } | obj.get_params()
+        headers, cached = {}, None
+        if self.page_cache is not None:
+            url = self.endpoints[t] + '?' + urlencode(sorted(params.items()))
+            headers, cached = self.page_cache.lookup(url)
+        throttled = 0
+        while True:
+            if self.rate_limit is not None:
+                self.rate_limit.acquire()
+            request_start = time.perf_counter()
+            r = self.s.get(self.endpoints[t], params=params, headers=headers, timeout=self.timeout)
+            latency = time.perf_counter() - request_start
+            if r.status_code != 429 or throttled >= self.THROTTLE_RETRIES:
+                break
+            throttled += 1
+            # same backoff as urllib3 when the server does not say how long to wait
+            wait = parse_retry_after(r.headers.get('Retry-After'))
+            if wait is None:
+                wait = 0 if throttled <= 1 else 0.1 * (2 ** (throttled - 1))
+            if self.rate_limit is not None:
+                # the server throttled us, let the other workers back off for as long as well
+                self.rate_limit.drain(wait)
+            else:
+                time.sleep(wait)
+        r.raise_for_status()
+        if latency > self.AUTO_SLOW_PAGE:
+            self._shrink_page_size(t, size)
+
+        content = r.content
+        if self.page_cache is not None:
+            if r.status_code == 304 and cached is not None:
+                self.page_cache.not_modified_hit(url)
+                content = cached
+            else:
+                self.page_cache.store(url, content, r.headers.get('ETag'), r.headers.get('Last-Modified'))
+
+        decode_start = time.perf_counter()
+        if decode:
+            result = loads(content)
+        else:
+            match = _LAST_PAGE.search(content)
+            result = {
+                'last_page': int(match.group(1)) if match else loads(content)['last_page'],
+                'content': content
+            }
+        if self.instrumentation is not None:
+            self.instrumentation.on_request(RequestEvent(
+                api=t.name,
+                entity=str(obj),
+                page=page,
+                status=r.status_code,
+                latency=latency,
+                bytes=_wire_bytes(r),
+                retries=throttled + (0 if r.raw.retries is None else len(r.raw.retries.history)),
+                decode_time=time.perf_counter() - decode_start
+            ))
+        return result
+
+    def _iter_jobs(self, jobs: list[tuple], decode: bool = True,
+                   started: list | None = None) -> Iterator[tuple[int, int, dict | Exception]]:
+        """
+        Fetch multiple (obj, api type, start, end) jobs through one shared worker pool.
+        The first page of every job is queued immediately, the remaining pages of a job are queued as soon
+        as its last_page is known. At most max_workers requests are in flight, new ones are only submitted when the
+        consumer asks for more, so memory stays bounded no matter how many pages there are.
+
+        :param started: optional list that gets the time the first page of every job was submitted
+        :return: iterator of (job index, page, response or the exception that stopped the job) in completion order
+        """
+        queue = deque((i, 1) for i in range(len(jobs)))
+        failed = set()
+        pending = {}
+        # the page size is fixed per job when its first page is requested, page numbers depend on it
+        sizes = [None] * len(jobs)
+        # page size limits of jobs that are retried with smaller pages after a 400, and the rejected sizes
+        limits = {}
+        rejected = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while queue or pending:
+                    while queue and len(pending) < self.max_workers:
+                        i, page = queue.popleft()
+                        if i in failed:
+                            continue
+                        obj, t, start, end = jobs[i]
+                        if page == 1:
+                            sizes[i] = self._page_size(t, start, end, limits.get(i))
+                            if started is not None and started[i] is None:
+                                started[i] = time.perf_counter()
+                        pending[executor.submit(self._fetch_page, obj, t, start, end,
+                                                page=page, size=sizes[i], decode=decode)] = (i, page)
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        i, page = pending.pop(f)
+                        if i in failed:
+                            # job already failed on another page
+                            continue
+                        try:
+                            r = f.result()
+                        except Exception as e:
+                            status = self._rejected_status(e) if page == 1 else None
+                            if status in [413, 414] and self._shrink_page_size(jobs[i][1], sizes[i]):
+                                # the api does not accept pages this large, start over with smaller ones
+                                queue.appendleft((i, 1))
+                                continue
+                            if status in [400, 422] and i not in limits and self._smaller_page_size(sizes[i]):
+                                # could be the page size or the request itself, try once with smaller pages
+                                # for this job only, if that fails as well the request is what is wrong
+                                limits[i] = self._smaller_page_size(sizes[i])
+                                rejected[i] = sizes[i]
+                                queue.appendleft((i, 1))
+                                continue
+                            failed.add(i)
+                            yield i, page, e
+                            continue
+                        if page == 1:
+                            if i in rejected:
+                                # smaller pages went through, so it was the page size, remember it for the next jobs
+                                self._shrink_page_size(jobs[i][1], rejected.pop(i))
+                            queue.extend((i, p) for p in range(2, r['last_page'] + 1))
+                        yield i, page, r
+            finally:
+                # consumer stopped early or something broke, do not start what is still waiting
+                for f in pending:
+                    f.cancel()
+
+    def _fetch_jobs(self, jobs: list[tuple], decode: bool = True,
+                    finish: Callable[[list[bytes]], object] | None = None) -> list:
+        """
+        :param decode: decode the pages, otherwise finish gets the raw bodies
+        :param finish: optional function that gets the pages of a job in page order as soon as they all arrived,
+            its result is used instead of the records
+        :return: list with for every job either the records in page order or the exception that stopped it
+        """
+        results = [None] * len(jobs)
+        pages = [{} for _ in jobs]
+        last_pages = [None] * len(jobs)
+        # every job is timed from its first request, not from the start of the batch it waited in
+        started = [None] * len(jobs)
+
+        for i, page, r in self._iter_jobs(jobs, decode=decode, started=started):
+            if isinstance(r, Exception):
+                results[i] = r
+                self._on_fetch(jobs[i], len(pages[i]), started[i], error=r)
+                pages[i] = None
+                continue
+            pages[i][page] = r['data'] if decode else r['content']
+            if page == 1:
+                last_pages[i] = max(r['last_page'], 1)
+            if len(pages[i]) == last_pages[i]:
+                if finish is not None:
+                    results[i] = finish([pages[i][p] for p in range(1, last_pages[i] + 1)])
+                else:
+                    data = [x for p in range(1, last_pages[i] + 1) for x in pages[i][p]]
+                    results[i] = data if len(data) else NoMatchingDataError()
+                self._on_fetch(jobs[i], last_pages[i], started[i])
+                pages[i] = None
+
+        return results
+
+    def _on_fetch(self, job: tuple, pages: int, fetch_start: float, error: Exception | None = None):
+        if self.instrumentation is not None:
+            obj, t, _, _ = job
+            self.instrumentation.on_fetch(FetchEvent(
+                api=t.name,
+                entity=str(obj),
+                pages=pages,
+                duration=time.perf_counter() - fetch_start,
+                error=None if error is None else repr(error)
+            ))
+
+    def _iter_pages(self, obj, t: APIType,
+                    start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[list[dict]]:
+        """
+        Stream the records of one entity page by page in api order, most recent gas day first.
+        Only the pages that are in flight or arrived ahead of their turn are held in memory.
+        """
         if type(start) is not pd.Timestamp:
             start = pd.Timestamp(start)
         if type(end) is not pd.Timestamp:
             end = pd.Timestamp(end)
 
-        def _fetch_one(start, end, obj, page=1):
-            r = self.s.get(t.value, params={
-                                               'from': start.strftime('%Y-%m-%d'),
-                                               'till': end.strftime('%Y-%m-%d'),
-                                               'size': 300,
-                                               'page': page
-                                           } | obj.get_params())
-            r.raise_for_status()
+        # windows are chronological, the api order is most recent first
+        jobs = [(obj, t) + span for span in reversed(self._split(start, end))]
+        last_pages = [None] * len(jobs)
+        arrived = {}
+        expected = (0, 1)
+        empty = True
 
-            return r.json()
+        for i, page, r in self._iter_jobs(jobs):
+            if isinstance(r, Exception):
+                raise r
+            if page == 1:
+                last_pages[i] = max(r['last_page'], 1)
+            arrived[(i, page)] = r['data']
+            while expected in arrived:
+                data = arrived.pop(expected)
+                if len(data):
+                    empty = False
+                    yield data
+                i, page = expected
+                expected = (i, page + 1) if page < last_pages[i] else (i + 1, 1)
 
-        r = _fetch_one(start, end, obj)
-        data = r['data']
-        if r['last_page'] != 1:
-            for p in range(2, r['last_page'] + 1):
-                data += _fetch_one(start, end, obj, page=p)['data']
-
-        if len(data) == 0:
+        if empty:
             raise NoMatchingDataError
 
+    def _split(self, start: pd.Timestamp, end: pd.Timestamp) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        if self.window is None:
+            return [(start, end)]
+        starts = [start] + [x for x in pd.date_range(start.normalize(), end, freq=self.window) if x > start]
+        ends = [x - pd.Timedelta(days=1) for x in starts[1:]] + [end]
+        return list(zip(starts, ends))
+
+    @staticmethod
+    def _rejected_status(e: Exception) -> int | None:
+        """
+        :return: status with which the api refused a request that may be too large, otherwise None
+        """
+        if isinstance(e, requests.HTTPError) and e.response is not None and \
+                e.response.status_code in [400, 413, 414, 422]:
+            return e.response.status_code
+        return None
+
+    @staticmethod
+    def _is_transient(e: Exception) -> bool:
+        # network errors and server errors that outlasted the retries of the adapter, anything else would fail again
+        if isinstance(e, requests.ConnectionError | requests.Timeout | requests.exceptions.RetryError):
+            return True
+        return isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code >= 500
+
+    def _fetch_windows(self, jobs: list[tuple], **kwargs) -> tuple[list[int], list]:
+        """
+        Split every job into windows which all go through the same pool, failed windows are retried on their own
+        instead of the whole range.
+
+        :param kwargs: passed on to _fetch_jobs
+        :return: tuple of the job index of every window and its result, windows in chronological order
+        """
+        windows = [(i, (obj, t) + span) for i, (obj, t, start, end) in enumerate(jobs) for span in self._split(start, end)]
+        results = self._fetch_jobs([w for _, w in windows], **kwargs)
+
+        # without windows a failed job already is the whole range, the adapter did all the retrying
+        for _ in range(self.window_retries if self.window is not None else 0):
+            failed = [k for k, r in enumerate(results) if isinstance(r, Exception) and self._is_transient(r)]
+            if len(failed) == 0:
+                break
+            for k, r in zip(failed, self._fetch_jobs([windows[k][1] for k in failed], **kwargs)):
+                results[k] = r
+
+        return [i for i, _ in windows], results
+
+    def _fetch_windowed(self, jobs: list[tuple]) -> list[list[dict] | Exception]:
+        owners, results = self._fetch_windows(jobs)
+        parts = [[] for _ in jobs]
+        for i, r in zip(owners, results):
+            parts[i].append(r)
+
+        stitched = []
+        for job_parts in parts:
+            error = next((r for r in job_parts if isinstance(r, Exception) and not isinstance(r, NoMatchingDataError)), None)
+            if error is not None:
+                stitched.append(error)
+                continue
+            # windows are in chronological order, the api returns the most recent gas day first
+            data = []
+            seen = set()
+            for r in reversed(job_parts):
+                if isinstance(r, NoMatchingDataError):
+                    continue
+                for x in r:
+                    if x['gasDayStart'] not in seen:
+                        seen.add(x['gasDayStart'])
+                        data.append(x)
+            stitched.append(data if len(data) else NoMatchingDataError())
+
+        return stitched
+
+    def _fetch_many(self, jobs: list[tuple]) -> list[list[dict] | Exception]:
+        if self.cache is None:
+            return self._fetch_windowed(jobs)
+
+        # only request the span of gas days per job that is not in the cache yet
+        cached = []
+        spans = []
+        for obj, t, start, end in jobs:
+            records, missing = self.cache.lookup(t, obj, start, end)
+            cached.append(records)
+            spans.append(missing)
+        fetched = iter(self._fetch_windowed([
+            (obj, t) + span for (obj, t, _, _), span in zip(jobs, spans) if span is not None
+        ]))
+
+        results = []
+        for (obj, t, _, _), records, span in zip(jobs, cached, spans):
+            data = []
+            if span is not None:
+                data = next(fetched)
+                if isinstance(data, NoMatchingDataError):
+                    data = []
+                elif isinstance(data, Exception):
+                    results.append(data)
+                    continue
+                self.cache.store(t, obj, span[0], span[1], data)
+                # the fetched span takes precedence over what was cached inside it
+                span_start, span_end = span[0].strftime('%Y-%m-%d'), span[1].strftime('%Y-%m-%d')
+                records = {k: v for k, v in records.items() if not span_start <= k <= span_end}
+            data = [x for x in records.values() if x is not None] + data
+            # keep the api ordering, most recent gas day first
+            data.sort(key=lambda x: x['gasDayStart'], reverse=True)
+            results.append(data if len(data) else NoMatchingDataError())
+
+        return results
+
+    def _fetch(self, obj, t: APIType,
+               start: pd.Timestamp | str, end: pd.Timestamp | str):
+        if type(start) is not pd.Timestamp:
+            start = pd.Timestamp(start)
+        if type(end) is not pd.Timestamp:
+            end = pd.Timestamp(end)
+
+        data = self._fetch_many([(obj, t, start, end)])[0]
+        if isinstance(data, Exception):
+            raise data
+
         return data
 
+    def _query_many(self, objs: list, t: APIType,
+                    start: pd.Timestamp | str, end: pd.Timestamp | str) -> tuple[dict, dict]:
+        if type(start) is not pd.Timestamp:
+            start = pd.Timestamp(start)
+        if type(end) is not pd.Timestamp:
+            end = pd.Timestamp(end)
+
+        results = self._fetch_many([(obj, t, start, end) for obj in objs])
+        data = {obj: r for obj, r in zip(objs, results) if not isinstance(r, Exception)}
+        errors = {obj: r for obj, r in zip(objs, results) if isinstance(r, Exception)}
+        return data, errors
+
     def query_gas_storage(self, storage: AGSIStorage | str,
                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
-        storage = lookup_storage(storage)
+        storage = self._lookup('storage', storage)
         return self._fetch(storage, APIType.AGSI, start=start, end=end)
 
     def query_gas_company(self, company: AGSICompany | str,
                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
-        company = lookup_company(company)
+        company = self._lookup('company', company)
         return self._fetch(company, APIType.AGSI, start=start, end=end)
 
     def query_gas_country(self, country: AGSICountry | str,
@@ -77,12 +640,12 @@ class GieRawClient:
 
     def query_lng_terminal(self, terminal: ALSITerminal | str,
                            start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
-        terminal = lookup_terminal(terminal)
+        terminal = self._lookup('terminal', terminal)
         return self._fetch(terminal, APIType.ALSI, start=start, end=end)
 
     def query_lng_lso(self, lso: ALSILSO | str,
                       start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
-        lso = lookup_lso(lso)
+        lso = self._lookup('lso', lso)
         return self._fetch(lso, APIType.ALSI, start=start, end=end)
 
     def query_lng_country(self, country: ALSICountry | str,
@@ -90,72 +653,362 @@ class GieRawClient:
         country = lookup_country_alsi(country)
         return self._fetch(country, APIType.ALSI, start=start, end=end)
 
+    def iter_gas_storage(self, storage: AGSIStorage | str,
+                         start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[list[dict]]:
+        storage = self._lookup('storage', storage)
+        return self._iter_pages(storage, APIType.AGSI, start=start, end=end)
+
+    def iter_gas_company(self, company: AGSICompany | str,
+                         start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[list[dict]]:
+        company = self._lookup('company', company)
+        return self._iter_pages(company, APIType.AGSI, start=start, end=end)
+
+    def iter_gas_country(self, country: AGSICountry | str,
+                         start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[list[dict]]:
+        country = lookup_country(country)
+        return self._iter_pages(country, APIType.AGSI, start=start, end=end)
+
+    def iter_lng_terminal(self, terminal: ALSITerminal | str,
+                          start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[list[dict]]:
+        terminal = self._lookup('terminal', terminal)
+        return self._iter_pages(terminal, APIType.ALSI, start=start, end=end)
+
+    def iter_lng_lso(self, lso: ALSILSO | str,
+                     start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[list[dict]]:
+        lso = self._lookup('lso', lso)
+        return self._iter_pages(lso, APIType.ALSI, start=start, end=end)
+
+    def iter_lng_country(self, country: ALSICountry | str,
+                         start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[list[dict]]:
+        country = lookup_country_alsi(country)
+        return self._iter_pages(country, APIType.ALSI, start=start, end=end)
+
+    def query_gas_storages(self, storages: list[AGSIStorage | str] | str,
+                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> tuple[dict, dict]:
+        """
+        Query multiple storages at once, all storage x page requests share the worker pool of this client.
+
+        :param storages: list of storages or 'all' for every storage in AGSIStorage, countries and companies
+            (as AGSICountry / AGSICompany) in the list are expanded into their storages
+        :return: tuple of a dict storage -> records and a dict storage -> exception for the storages that failed
+        """
+        if storages == 'all':
+            storages = list(AGSIStorage)
+        else:
+            storages = list(dict.fromkeys(
+                y for x in storages
+                for y in (expand_facilities(x) if isinstance(x, AGSICountry | AGSICompany) else [self._lookup('storage', x)])
+            ))
+        return self._query_many(storages, APIType.AGSI, start=start, end=end)
+
+    def query_lng_terminals(self, terminals: list[ALSITerminal | str] | str,
+                            start: pd.Timestamp | str, end: pd.Timestamp | str) -> tuple[dict, dict]:
+        """
+        Query multiple terminals at once, all terminal x page requests share the worker pool of this client.
+
+        :param terminals: list of terminals or 'all' for every terminal in ALSITerminal, countries and lso's
+            (as ALSICountry / ALSILSO) in the list are expanded into their terminals
+        :return: tuple of a dict terminal -> records and a dict terminal -> exception for the terminals that failed
+        """
+        if terminals == 'all':
+            terminals = list(ALSITerminal)
+        else:
+            terminals = list(dict.fromkeys(
+                y for x in terminals
+                for y in (expand_facilities(x) if isinstance(x, ALSICountry | ALSILSO) else [self._lookup('terminal', x)])
+            ))
+        return self._query_many(terminals, APIType.ALSI, start=start, end=end)
+
 
 class GiePandasClient(GieRawClient):
+    def __init__(self, api_key, store: 'GieStore | None' = None, parse_processes: int | None = None, **kwargs):
+        """
+        :param store: optional local store that load() reads from and writes into
+        :param parse_processes: optional number of processes that decode and parse the pages of the bulk queries
+            while the next pages are being fetched, only used without a cache
+        :param kwargs: see GieRawClient
+        """
+        super().__init__(api_key, **kwargs)
+        self.store = store
+        self.parse_processes = parse_processes
+
+    def _on_parse(self, t: APIType | None, rows: int, duration: float, entity=None):
+        if self.instrumentation is not None:
+            self.instrumentation.on_parse(ParseEvent(
+                api=t.name if t is not None else '',
+                entity=str(entity) if entity is not None else '',
+                rows=rows,
+                duration=duration
+            ))
+
+    def _parse(self, data: list[dict], t: APIType | None = None, entity=None) -> pd.DataFrame:
+        parse_start = time.perf_counter()
+        df = self._fix_dataframe(data, t=t)
+        self._on_parse(t, len(df), time.perf_counter() - parse_start, entity=entity)
+        return df
+
     @staticmethod
-    def _fix_dataframe(data):
-        def _fix_values(x):
-            if 'inventory' in x:
-                x['inventory'] = x['inventory']['lng']
-            if 'dtmi' in x:
-                x['dtmi'] = x['dtmi']['lng']
-            return x
-
-        df = pd.DataFrame([_fix_values(x) for x in data])
-        for c in ['name', 'code', 'url', 'info']:
-            if c in df:
-                df = df.drop(columns=c)
-        df = df.loc[df['status'] != 'N']
-        df['gasDayStart'] = pd.to_datetime(df['gasDayStart'])
-        df = df.set_index('gasDayStart')
-        # status is only str column, save it for now, convert whole dataframe to float, restore status
-        status = df['status'].copy()
-        updated_at = pd.to_datetime(df['updatedAt'])
-        df = df.drop(columns=['status', 'updatedAt'])
-        if 'type' in df:
-            df = df.drop(columns=['type'])
-        for column in df.columns:
-            try:
-                df[column] = pd.to_numeric(df[column].replace('-', 0).infer_objects())
-            except ValueError:
-                pass
-        # df = df.replace('-', 0).astype(float)
-        df['status'] = status
-        df['updatedAt'] = updated_at
+    def _fix_dataframe(data, t: APIType | None = None):
+        """
+        Build the dataframe column by column straight from the records with the dtypes of the schema of the api,
+        so frames of different calls and entities have the same columns and dtypes.
+        """
+        t, gas_days, columns, status, updated_at = parse_records(data, t)
+        index = pd.DatetimeIndex(pd.to_datetime(gas_days).astype(DATETIME_DTYPE), name='gasDayStart')
+        df = pd.DataFrame(columns, index=index)
+        df['status'] = pd.Categorical(status, dtype=SCHEMAS[t]['status'])
+        df['updatedAt'] = pd.to_datetime(updated_at).astype(SCHEMAS[t]['updatedAt'])
         return df
 
     def query_gas_storage(self, storage: AGSIStorage | str,
                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
-        return self._fix_dataframe(
-            super().query_gas_storage(storage=storage, start=start, end=end)
+        storage = self._lookup('storage', storage)
+        return self._parse(
+            super().query_gas_storage(storage=storage, start=start, end=end),
+            t=APIType.AGSI, entity=storage
         )
 
     def query_gas_company(self, company: AGSIStorage | str,
                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
-        return self._fix_dataframe(
-            super().query_gas_company(company=company, start=start, end=end)
+        company = self._lookup('company', company)
+        return self._parse(
+            super().query_gas_company(company=company, start=start, end=end),
+            t=APIType.AGSI, entity=company
         )
 
     def query_gas_country(self, country: AGSICountry | str,
                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
-        return self._fix_dataframe(
-            super().query_gas_country(country=country, start=start, end=end)
+        country = lookup_country(country)
+        return self._parse(
+            super().query_gas_country(country=country, start=start, end=end),
+            t=APIType.AGSI, entity=country
         )
 
     def query_lng_terminal(self, terminal: ALSITerminal | str,
                            start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
-        return self._fix_dataframe(
-            super().query_lng_terminal(terminal=terminal, start=start, end=end)
+        terminal = self._lookup('terminal', terminal)
+        return self._parse(
+            super().query_lng_terminal(terminal=terminal, start=start, end=end),
+            t=APIType.ALSI, entity=terminal
         )
 
     def query_lng_lso(self, lso: ALSILSO | str,
                       start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
-        return self._fix_dataframe(
-            super().query_lng_lso(lso=lso, start=start, end=end)
+        lso = self._lookup('lso', lso)
+        return self._parse(
+            super().query_lng_lso(lso=lso, start=start, end=end),
+            t=APIType.ALSI, entity=lso
         )
 
     def query_lng_country(self, country: ALSICountry | str,
                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
-        return self._fix_dataframe(
-            super().query_lng_country(country=country, start=start, end=end)
+        country = lookup_country_alsi(country)
+        return self._parse(
+            super().query_lng_country(country=country, start=start, end=end),
+            t=APIType.ALSI, entity=country
         )
+
+    def _iter_dataframes(self, pages: Iterator[list[dict]], t: APIType, entity=None) -> Iterator[pd.DataFrame]:
+        for page in pages:
+            df = self._parse(page, t=t, entity=entity)
+            if len(df):
+                yield df
+
+    def iter_gas_storage(self, storage: AGSIStorage | str,
+                         start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[pd.DataFrame]:
+        storage = self._lookup('storage', storage)
+        return self._iter_dataframes(super().iter_gas_storage(storage=storage, start=start, end=end), APIType.AGSI,
+                                     storage)
+
+    def iter_gas_company(self, company: AGSICompany | str,
+                         start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[pd.DataFrame]:
+        company = self._lookup('company', company)
+        return self._iter_dataframes(super().iter_gas_company(company=company, start=start, end=end), APIType.AGSI,
+                                     company)
+
+    def iter_gas_country(self, country: AGSICountry | str,
+                         start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[pd.DataFrame]:
+        country = lookup_country(country)
+        return self._iter_dataframes(super().iter_gas_country(country=country, start=start, end=end), APIType.AGSI,
+                                     country)
+
+    def iter_lng_terminal(self, terminal: ALSITerminal | str,
+                          start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[pd.DataFrame]:
+        terminal = self._lookup('terminal', terminal)
+        return self._iter_dataframes(super().iter_lng_terminal(terminal=terminal, start=start, end=end), APIType.ALSI,
+                                     terminal)
+
+    def iter_lng_lso(self, lso: ALSILSO | str,
+                     start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[pd.DataFrame]:
+        lso = self._lookup('lso', lso)
+        return self._iter_dataframes(super().iter_lng_lso(lso=lso, start=start, end=end), APIType.ALSI,
+                                     lso)
+
+    def iter_lng_country(self, country: ALSICountry | str,
+                         start: pd.Timestamp | str, end: pd.Timestamp | str) -> Iterator[pd.DataFrame]:
+        country = lookup_country_alsi(country)
+        return self._iter_dataframes(super().iter_lng_country(country=country, start=start, end=end), APIType.ALSI,
+                                     country)
+
+    def _query_many(self, objs: list, t: APIType,
+                    start: pd.Timestamp | str, end: pd.Timestamp | str) -> tuple[dict, dict]:
+        if self.parse_processes is None or self.cache is not None:
+            return super()._query_many(objs, t, start=start, end=end)
+        if type(start) is not pd.Timestamp:
+            start = pd.Timestamp(start)
+        if type(end) is not pd.Timestamp:
+            end = pd.Timestamp(end)
+
+        errors = {}
+        frames = {}
+        # the fetch threads are already running when the first job is handed over, so the parse processes
+        # must not be forked from this process
+        with ProcessPoolExecutor(self.parse_processes, mp_context=_parse_context()) as pool:
+            # a window is handed to the pool as soon as all its pages arrived, while the other windows are still
+            # being fetched, the raw bodies are all that has to be sent over
+            owners, results = self._fetch_windows(
+                [(obj, t, start, end) for obj in objs], decode=False,
+                finish=lambda contents: pool.submit(_parse_pages, contents, t)
+            )
+
+            # most recent window first, like the api
+            for k, r in reversed(list(zip(owners, results))):
+                obj = objs[k]
+                if obj in errors:
+                    continue
+                try:
+                    if isinstance(r, Exception):
+                        raise r
+                    df, duration = r.result()
+                except Exception as e:
+                    errors[obj] = e
+                    frames.pop(obj, None)
+                    continue
+                self._on_parse(t, len(df), duration, entity=obj)
+                if len(df):
+                    frames.setdefault(obj, []).append(df)
+
+        data = {obj: pd.concat(frames[obj]) for obj in objs if obj in frames}
+        for obj in objs:
+            if obj not in data and obj not in errors:
+                errors[obj] = NoMatchingDataError()
+        return data, errors
+
+    def _concat_many(self, data: dict) -> pd.DataFrame:
+        # one long format dataframe with the entity code as outer index level,
+        # the values are records or frames that were already parsed by the parse processes
+        if len(data) == 0:
+            return pd.DataFrame()
+        return pd.concat({obj.code: x if isinstance(x, pd.DataFrame) else self._parse(x, t=api_type(obj), entity=obj)
+                          for obj, x in data.items()},
+                         names=['code', 'gasDayStart'])
+
+    def query_gas_storages(self, storages: list[AGSIStorage | str] | str,
+                           start: pd.Timestamp | str, end: pd.Timestamp | str) -> tuple[pd.DataFrame, dict]:
+        data, errors = super().query_gas_storages(storages=storages, start=start, end=end)
+        return self._concat_many(data), errors
+
+    def query_lng_terminals(self, terminals: list[ALSITerminal | str] | str,
+                            start: pd.Timestamp | str, end: pd.Timestamp | str) -> tuple[pd.DataFrame, dict]:
+        data, errors = super().query_lng_terminals(terminals=terminals, start=start, end=end)
+        return self._concat_many(data), errors
+
+    def query_panel(self, entities: list, start: pd.Timestamp | str, end: pd.Timestamp | str,
+                    metrics: list[str] | None = None) -> tuple[GiePanel, dict]:
+        """
+        Fetch the entities into one preallocated gas days x entities matrix per metric. Pages are parsed and
+        written into the panel as they arrive, no dataframe per entity is built.
+
+        :param entities: list of enum members of the same api, for example all storages of a country
+        :param metrics: columns to keep, defaults to all numeric columns of the api
+        :return: tuple of the panel and a dict entity -> exception for the entities that failed or had no data
+        """
+        if type(start) is not pd.Timestamp:
+            start = pd.Timestamp(start)
+        if type(end) is not pd.Timestamp:
+            end = pd.Timestamp(end)
+        types = {api_type(x) for x in entities}
+        if len(types) != 1:
+            raise ValueError('All entities of a panel should belong to the same api')
+        t = types.pop()
+        if metrics is None:
+            metrics = [c for c in SCHEMAS[t] if c not in ['status', 'updatedAt']]
+
+        panel = GiePanel(start, end, metrics, [x.code for x in entities])
+        # position of the entity in the panel, and the window of it
+        jobs = [(k, (x, t) + span) for k, x in enumerate(entities) for span in self._split(start, end)]
+        errors = {}
+        has_data = set()
+        for i, _, r in self._iter_jobs([job for _, job in jobs]):
+            k = jobs[i][0]
+            if entities[k] in errors:
+                continue
+            if isinstance(r, Exception):
+                errors[entities[k]] = r
+                panel.clear(k)
+                continue
+            if len(r['data']):
+                _, gas_days, columns, _, _ = parse_records(r['data'], t)
+                panel.write(k, gas_days, columns)
+                has_data.add(k)
+
+        for k, x in enumerate(entities):
+            if k not in has_data and x not in errors:
+                errors[x] = NoMatchingDataError()
+        return panel, errors
+
+    def load(self, entity, start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
+        """
+        Read an entity from the local store, only the gas days that were not fetched before are requested
+        from the api and written into the store first.
+
+        :param entity: enum member of the entity, for example AGSIStorage.ugs_norg_langelo
+        """
+        if self.store is None:
+            raise ValueError('load requires a store, pass one with GiePandasClient(store=GieStore(...))')
+        if type(start) is not pd.Timestamp:
+            start = pd.Timestamp(start)
+        if type(end) is not pd.Timestamp:
+            end = pd.Timestamp(end)
+
+        t = api_type(entity)
+        spans = self.store.missing(entity, start, end)
+        # all missing spans go through the shared worker pool at once
+        for span, data in zip(spans, self._fetch_many([(entity, t) + span for span in spans])):
+            if isinstance(data, NoMatchingDataError):
+                data = None
+            elif isinstance(data, Exception):
+                raise data
+            self.store.write(entity, span[0], span[1], None if data is None else self._parse(data, t=t, entity=entity))
+
+        df = self.store.read(entity, start, end)
+        if len(df) == 0:
+            raise NoMatchingDataError
+        return df
+
+
+def _wire_bytes(r: requests.Response) -> int:
+    """
+    :return: number of bytes of the response body as transferred, so before decompression
+    """
+    try:
+        return r.raw.tell()
+    except (AttributeError, TypeError):
+        return int(r.headers.get('Content-Length', len(r.content)))
+
+
+def _parse_context() -> multiprocessing.context.BaseContext:
+    # forkserver children are forked from a clean single threaded server process, spawn where it does not exist
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _parse_pages(contents: list[bytes], t: APIType) -> tuple[pd.DataFrame, float]:
+    """
+    Decode the pages of a job and build its dataframe, runs in the parse processes of GiePandasClient.
+    The dataframe is sent back pickled, which for its numeric blocks is a plain copy of the buffers.
+    """
+    parse_start = time.perf_counter()
+    df = GiePandasClient._fix_dataframe([x for content in contents for x in loads(content)['data']], t=t)
+    return df, time.perf_counter() - parse_start
@@ -0,0 +1,210 @@
+import asyncio
+import pandas as pd
+from .agsi_mappings import AGSICompany, AGSIStorage, AGSICountry, lookup_company, lookup_storage, lookup_country
+from .alsi_mappings import ALSITerminal, ALSILSO, ALSICountry, lookup_terminal, lookup_lso, \
+    lookup_country as lookup_country_alsi
+from .exceptions import *
+from .gie import APIType, GiePandasClient, __version__
+from .ratelimit import TokenBucket
+from .transport import parse_retry_after
+from .decoding import loads
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncGieRawClient:
+    # same semantics as the Retry adapter of the sync client
+    RETRY_TOTAL = 5
+    RETRY_BACKOFF_FACTOR = 0.1
+    RETRY_STATUS_FORCELIST = [429, 500, 502, 503, 504]
+
+    def __init__(self, api_key, max_workers: int = 4, max_connections: int = 100,
+                 rate_limit: TokenBucket | None = None, endpoints: dict | None = None, page_size: int = 300,
+                 timeout: tuple[float, float] | None = (10, 60)):
+        """
+        :param api_key: api key for agsi.gie.eu / alsi.gie.eu
+        :param max_workers: maximum number of page requests in flight at the same time for one query
+        :param max_connections: size of the connection pool shared by all queries on this client
+        :param rate_limit: optional token bucket every request of this client has to pass
+        :param endpoints: optional api type -> url overrides, for example the endpoints of a local StubServer
+        :param page_size: number of gas days per request
+        :param timeout: seconds to wait for a connection and for data of a response, None to wait forever
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncGieRawClient requires aiohttp, install it with pip install gie-py[async]')
+        self.max_workers = max_workers
+        self.max_connections = max_connections
+        self.rate_limit = rate_limit
+        self.endpoints = {t: t.value for t in APIType} | (endpoints or {})
+        self.page_size = page_size
+        self.timeout = timeout
+        self.headers = {
+            'user-agent': f'gie-py v{__version__} (github.com/fboerman/gie-py)',
+            'x-key': api_key
+        }
+        self._s = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._s is not None:
+            await self._s.close()
+            self._s = None
+
+    @property
+    def s(self) -> 'aiohttp.ClientSession':
+        # the session has to be created inside a running event loop, so do it on first use
+        if self._s is None:
+            self._s = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=None) if self.timeout is None else
+                aiohttp.ClientTimeout(total=None, sock_connect=self.timeout[0], sock_read=self.timeout[1]),
+                raise_for_status=False
+            )
+        return self._s
+
+    @classmethod
+    def _backoff(cls, retry: int) -> float:
+        # mirrors urllib3 Retry.get_backoff_time(): no sleep before the first retry, then exponential
+        if retry <= 1:
+            return 0
+        return cls.RETRY_BACKOFF_FACTOR * (2 ** (retry - 1))
+
+    async def _fetch_page(self, obj, t: APIType,
+                          start: pd.Timestamp, end: pd.Timestamp, page: int = 1) -> dict:
+        params = {
+            'from': start.strftime('%Y-%m-%d'),
+            'till': end.strftime('%Y-%m-%d'),
+            'size': self.page_size,
+            'page': page
+        } | obj.get_params()
+
+        retry = 0
+        while True:
+            retry_after = None
+            if self.rate_limit is not None:
+                await self.rate_limit.acquire_async()
+            try:
+                async with self.s.get(self.endpoints[t], params=params) as r:
+                    if r.status not in self.RETRY_STATUS_FORCELIST or retry >= self.RETRY_TOTAL:
+                        r.raise_for_status()
+                        return loads(await r.read())
+                    if r.status == 429:
+                        retry_after = parse_retry_after(r.headers.get('Retry-After'))
+                        if self.rate_limit is not None:
+                            self.rate_limit.drain(retry_after or 0.0)
+            except aiohttp.ClientConnectionError:
+                if retry >= self.RETRY_TOTAL:
+                    raise
+            retry += 1
+            await asyncio.sleep(retry_after if retry_after is not None else self._backoff(retry))
+
+    async def _fetch(self, obj, t: APIType,
+                     start: pd.Timestamp | str, end: pd.Timestamp | str):
+        if type(start) is not pd.Timestamp:
+            start = pd.Timestamp(start)
+        if type(end) is not pd.Timestamp:
+            end = pd.Timestamp(end)
+
+        r = await self._fetch_page(obj, t, start, end)
+        data = r['data']
+        if r['last_page'] != 1:
+            semaphore = asyncio.Semaphore(self.max_workers)
+
+            async def _fetch_bounded(p):
+                async with semaphore:
+                    return await self._fetch_page(obj, t, start, end, page=p)
+
+            # gather keeps the pages in order
+            pages = await asyncio.gather(*[_fetch_bounded(p) for p in range(2, r['last_page'] + 1)])
+            for page in pages:
+                data += page['data']
+
+        if len(data) == 0:
+            raise NoMatchingDataError
+
+        return data
+
+    async def query_gas_storage(self, storage: AGSIStorage | str,
+                                start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
+        storage = lookup_storage(storage)
+        return await self._fetch(storage, APIType.AGSI, start=start, end=end)
+
+    async def query_gas_company(self, company: AGSICompany | str,
+                                start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
+        company = lookup_company(company)
+        return await self._fetch(company, APIType.AGSI, start=start, end=end)
+
+    async def query_gas_country(self, country: AGSICountry | str,
+                                start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
+        country = lookup_country(country)
+        return await self._fetch(country, APIType.AGSI, start=start, end=end)
+
+    async def query_lng_terminal(self, terminal: ALSITerminal | str,
+                                 start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
+        terminal = lookup_terminal(terminal)
+        return await self._fetch(terminal, APIType.ALSI, start=start, end=end)
+
+    async def query_lng_lso(self, lso: ALSILSO | str,
+                            start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
+        lso = lookup_lso(lso)
+        return await self._fetch(lso, APIType.ALSI, start=start, end=end)
+
+    async def query_lng_country(self, country: ALSICountry | str,
+                                start: pd.Timestamp | str, end: pd.Timestamp | str) -> list[dict]:
+        country = lookup_country_alsi(country)
+        return await self._fetch(country, APIType.ALSI, start=start, end=end)
+
+
+class AsyncGiePandasClient(AsyncGieRawClient):
+    _fix_dataframe = staticmethod(GiePandasClient._fix_dataframe)
+
+    async def query_gas_storage(self, storage: AGSIStorage | str,
+                                start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
+        return self._fix_dataframe(
+            await super().query_gas_storage(storage=storage, start=start, end=end),
+            t=APIType.AGSI
+        )
+
+    async def query_gas_company(self, company: AGSICompany | str,
+                                start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
+        return self._fix_dataframe(
+            await super().query_gas_company(company=company, start=start, end=end),
+            t=APIType.AGSI
+        )
+
+    async def query_gas_country(self, country: AGSICountry | str,
+                                start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
+        return self._fix_dataframe(
+            await super().query_gas_country(country=country, start=start, end=end),
+            t=APIType.AGSI
+        )
+
+    async def query_lng_terminal(self, terminal: ALSITerminal | str,
+                                 start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
+        return self._fix_dataframe(
+            await super().query_lng_terminal(terminal=terminal, start=start, end=end),
+            t=APIType.ALSI
+        )
+
+    async def query_lng_lso(self, lso: ALSILSO | str,
+                            start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
+        return self._fix_dataframe(
+            await super().query_lng_lso(lso=lso, start=start, end=end),
+            t=APIType.ALSI
+        )
+
+    async def query_lng_country(self, country: ALSICountry | str,
+                                start: pd.Timestamp | str, end: pd.Timestamp | str) -> pd.DataFrame:
+        return self._fix_dataframe(
+            await super().query_lng_country(country=country, start=start, end=end),
+            t=APIType.ALSI
+        )
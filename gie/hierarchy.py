@@ -0,0 +1,82 @@
+from collections import defaultdict
+from functools import cache
+from .agsi_mappings import AGSICompany, AGSIStorage, AGSICountry
+from .alsi_mappings import ALSITerminal, ALSILSO, ALSICountry
+
+
+def _country_code(country: AGSICountry | ALSICountry | str) -> str:
+    # facilities carry plain country codes, the post brexit GB* country covers the GB facilities
+    return str(country).rstrip('*')
+
+
+@cache
+def _index() -> dict[str, dict]:
+    """
+    All parent -> children relations of the mappings, built once so every lookup is a dict access.
+    Companies and lsos are keyed by code alone, companies operating in several countries are enum aliases
+    of a single member that carries only one of those countries.
+    """
+    index = defaultdict(lambda: defaultdict(list))
+    for storage in AGSIStorage:
+        index['storages_of_country'][storage.country].append(storage)
+        index['storages_of_company'][storage.company].append(storage)
+    for company in AGSICompany:
+        index['companies_of_country'][company.country].append(company)
+    for terminal in ALSITerminal:
+        index['terminals_of_country'][terminal.country].append(terminal)
+        index['terminals_of_lso'][terminal.company].append(terminal)
+    for lso in ALSILSO:
+        index['lsos_of_country'][lso.country].append(lso)
+    return {k: {key: tuple(children) for key, children in v.items()} for k, v in index.items()}
+
+
+@cache
+def facility_parents() -> dict[str, tuple[str, str]]:
+    """
+    :return: storage or terminal code -> (company or lso code, country code) for all facilities of the mappings
+    """
+    parents = {}
+    for facility in list(AGSIStorage) + list(ALSITerminal):
+        parents.setdefault(facility.code, (facility.company, facility.country))
+    return parents
+
+
+def storages_of_country(country: AGSICountry) -> tuple[AGSIStorage, ...]:
+    return _index()['storages_of_country'].get(_country_code(country), ())
+
+
+def storages_of_company(company: AGSICompany) -> tuple[AGSIStorage, ...]:
+    return _index()['storages_of_company'].get(company.code, ())
+
+
+def companies_of_country(country: AGSICountry) -> tuple[AGSICompany, ...]:
+    return _index()['companies_of_country'].get(_country_code(country), ())
+
+
+def terminals_of_country(country: ALSICountry) -> tuple[ALSITerminal, ...]:
+    return _index()['terminals_of_country'].get(_country_code(country), ())
+
+
+def terminals_of_lso(lso: ALSILSO) -> tuple[ALSITerminal, ...]:
+    return _index()['terminals_of_lso'].get(lso.code, ())
+
+
+def lsos_of_country(country: ALSICountry) -> tuple[ALSILSO, ...]:
+    return _index()['lsos_of_country'].get(_country_code(country), ())
+
+
+def expand_facilities(entity) -> tuple[AGSIStorage | ALSITerminal, ...]:
+    """
+    Expand a country, company or lso into its storages or terminals, a facility expands into itself.
+    """
+    if isinstance(entity, AGSIStorage | ALSITerminal):
+        return entity,
+    if isinstance(entity, AGSICompany):
+        return storages_of_company(entity)
+    if isinstance(entity, AGSICountry):
+        return storages_of_country(entity)
+    if isinstance(entity, ALSILSO):
+        return terminals_of_lso(entity)
+    if isinstance(entity, ALSICountry):
+        return terminals_of_country(entity)
+    raise ValueError(f'Cannot expand {entity!r} into facilities')
@@ -0,0 +1,138 @@
+import threading
+from collections import defaultdict
+from typing import NamedTuple
+import pandas as pd
+
+
+class RequestEvent(NamedTuple):
+    api: str
+    entity: str
+    page: int
+    status: int
+    latency: float
+    bytes: int
+    retries: int
+    decode_time: float
+
+
+class FetchEvent(NamedTuple):
+    api: str
+    entity: str
+    pages: int
+    duration: float
+    error: str | None
+
+
+class ParseEvent(NamedTuple):
+    api: str
+    entity: str
+    rows: int
+    duration: float
+
+
+class Instrumentation:
+    """
+    Hooks the clients call while fetching and parsing, override the ones you need.
+    Hooks are called from the worker threads, so implementations have to be thread safe.
+    """
+
+    def on_request(self, event: RequestEvent):
+        """
+        Called after every page request with its latency, bytes transferred (compressed), retries and json
+        decode time.
+        """
+        pass
+
+    def on_fetch(self, event: FetchEvent):
+        """
+        Called when all pages of an entity (or window of it) were fetched, or when fetching it failed.
+        The duration is measured from the request of its first page.
+        """
+        pass
+
+    def on_parse(self, event: ParseEvent):
+        """
+        Called after records were turned into a dataframe.
+        """
+        pass
+
+
+class MetricsCollector(Instrumentation):
+    """
+    Default in memory collector that keeps all events and aggregates them per entity.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = []
+        self.fetches = []
+        self.parses = []
+
+    def on_request(self, event: RequestEvent):
+        with self._lock:
+            self.requests.append(event)
+
+    def on_fetch(self, event: FetchEvent):
+        with self._lock:
+            self.fetches.append(event)
+
+    def on_parse(self, event: ParseEvent):
+        with self._lock:
+            self.parses.append(event)
+
+    def clear(self):
+        with self._lock:
+            self.requests = []
+            self.fetches = []
+            self.parses = []
+
+    def summary(self) -> pd.DataFrame:
+        """
+        :return: dataframe with per api and entity the number of requests, latency, bytes, retries, decode time
+            and time spent building dataframes, sorted with the slowest entities first
+        """
+        with self._lock:
+            df = pd.DataFrame(self.requests, columns=RequestEvent._fields)
+            parses = pd.DataFrame(self.parses, columns=ParseEvent._fields)
+        if len(df) == 0:
+            return df
+        summary = df.groupby(['api', 'entity']).agg(
+            requests=('page', 'size'),
+            latency_total=('latency', 'sum'),
+            latency_mean=('latency', 'mean'),
+            latency_max=('latency', 'max'),
+            bytes=('bytes', 'sum'),
+            retries=('retries', 'sum'),
+            decode_time=('decode_time', 'sum'),
+        )
+        summary['parse_time'] = parses.groupby(['api', 'entity'])['duration'].sum().reindex(summary.index).fillna(0.0)
+        return summary.sort_values('latency_total', ascending=False)
+
+    def to_prometheus(self, prefix: str = 'gie') -> str:
+        """
+        :return: the collected totals in the prometheus text exposition format, per api and entity
+        """
+        totals = defaultdict(lambda: defaultdict(float))
+        with self._lock:
+            for x in self.requests:
+                labels = f'api="{x.api}",entity="{x.entity}"'
+                totals['requests_total'][labels] += 1
+                totals['request_seconds_total'][labels] += x.latency
+                totals['response_bytes_total'][labels] += x.bytes
+                totals['retries_total'][labels] += x.retries
+                totals['decode_seconds_total'][labels] += x.decode_time
+            for x in self.fetches:
+                labels = f'api="{x.api}",entity="{x.entity}"'
+                totals['fetches_total'][labels] += 1
+                totals['fetch_errors_total'][labels] += x.error is not None
+            for x in self.parses:
+                labels = f'api="{x.api}",entity="{x.entity}"'
+                totals['parsed_rows_total'][labels] += x.rows
+                totals['parse_seconds_total'][labels] += x.duration
+
+        lines = []
+        for name, values in totals.items():
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            for labels, value in values.items():
+                lines.append(f'{prefix}_{name}{{{labels}}} {value:g}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,64 @@
+import difflib
+import enum
+import re
+from functools import cache
+
+
+def normalize(s: str) -> str:
+    """
+    Normalized form of a name or code used for forgiving lookups: case folded and without separators,
+    so 'UGS Norg-Langelo' and 'ugs_norg_langelo' are the same.
+    """
+    return re.sub(r'[\s_\-.]', '', s.casefold())
+
+
+@cache
+def build_index(enum_cls: type[enum.Enum]) -> dict[str, enum.Enum]:
+    """
+    Index of all the ways a member of a mapping enum can be referred to, built once per enum.
+    Exact member names (including aliases) take precedence over exact codes, which take precedence
+    over the case folded and normalized forms of names, codes and full names.
+    """
+    index = {}
+    for name, member in enum_cls.__members__.items():
+        index.setdefault(name, member)
+    for member in enum_cls:
+        index.setdefault(member.value, member)
+    for transform in [str.casefold, normalize]:
+        # names of all members before any code, so a name still wins over a code in another case
+        for name, member in enum_cls.__members__.items():
+            index.setdefault(transform(name), member)
+        for member in enum_cls:
+            index.setdefault(transform(member.value), member)
+            if hasattr(member, 'full_name'):
+                index.setdefault(transform(member.full_name), member)
+
+    # a name or code has to resolve to the same member in any case or spelling
+    for key in list(enum_cls.__members__) + [member.value for member in enum_cls]:
+        for transform in [str.casefold, normalize]:
+            if index[transform(key)] is not index[key]:
+                raise RuntimeError(f'{enum_cls.__name__}: {key!r} and {transform(key)!r} resolve to different members')
+    return index
+
+
+def lookup_member(enum_cls: type[enum.Enum], s: str, kind: str) -> enum.Enum:
+    """
+    Constant time lookup of a member by name, code or full name, falling back to case insensitive and
+    normalized matching. Raises a ValueError with the closest matches if nothing matches.
+    """
+    if not isinstance(s, str):
+        # a member of another mapping, for example a storage where a company is expected
+        raise ValueError(f'Invalid {kind} string')
+    index = build_index(enum_cls)
+    try:
+        return index[s]
+    except KeyError:
+        pass
+    member = index.get(s.casefold(), None) or index.get(normalize(s), None)
+    if member is not None:
+        return member
+
+    suggestions = difflib.get_close_matches(normalize(s), [k for k in index if k == normalize(k)], n=3)
+    if len(suggestions):
+        raise ValueError(f'Invalid {kind} string, did you mean {", ".join(index[x].name for x in suggestions)}?')
+    raise ValueError(f'Invalid {kind} string')
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+
+class GiePanel:
+    """
+    Metrics of many entities on one shared gas day index, preallocated as a single float array of
+    metrics x gas days x entities that pages are written into as they arrive. Gas days without data are NaN.
+    Every metric is a contiguous gas days x entities matrix, so frame() wraps it without copying.
+    """
+
+    def __init__(self, start: pd.Timestamp, end: pd.Timestamp, metrics: list[str], codes: list[str],
+                 dtype='float32'):
+        """
+        :param metrics: names of the columns to keep, for example gasInStorage or sendOut
+        :param codes: codes of the entities, one per column of the matrices
+        """
+        self.gas_days = pd.date_range(start.normalize(), end.normalize(), freq='D', name='gasDayStart')
+        self.metrics = list(metrics)
+        self.codes = list(codes)
+        self.values = np.full((len(self.metrics), len(self.gas_days), len(self.codes)), np.nan, dtype=dtype)
+        self._start = np.datetime64(start.normalize(), 'D')
+
+    def write(self, entity: int, gas_days: list[str], columns: dict[str, np.ndarray]):
+        """
+        Write parsed records of the entity at this position into the panel, pages can come in any order.
+        """
+        positions = (np.array(gas_days, dtype='datetime64[D]') - self._start).astype('int64')
+        inside = (positions >= 0) & (positions < len(self.gas_days))
+        if not inside.all():
+            positions = positions[inside]
+            columns = {c: values[inside] for c, values in columns.items()}
+        for k, metric in enumerate(self.metrics):
+            if metric in columns:
+                self.values[k, positions, entity] = columns[metric]
+
+    def clear(self, entity: int):
+        self.values[:, :, entity] = np.nan
+
+    def frame(self, metric: str) -> pd.DataFrame:
+        """
+        :return: gas days x entity codes dataframe of one metric, a view on the panel
+        """
+        return pd.DataFrame(self.values[self.metrics.index(metric)], index=self.gas_days,
+                            columns=pd.Index(self.codes, name='code'), copy=False)
+
+    def __getitem__(self, metric: str) -> pd.DataFrame:
+        return self.frame(metric)
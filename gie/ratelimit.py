@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter shared by all requests of a client and its worker threads.
+    When given a path the bucket state lives in that file, guarded by a file lock, so sibling processes
+    using the same path share one budget.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None, path: str | None = None):
+        """
+        :param rate: requests per second that are allowed on average
+        :param burst: maximum number of requests that can be made at once after being idle, defaults to rate
+        :param path: optional file to share the bucket between processes
+        """
+        if path is not None and fcntl is None:
+            raise NotImplementedError('Sharing a TokenBucket between processes requires fcntl (posix)')
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.path = path
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+
+    def _read(self, fh) -> tuple[float, float]:
+        if fh is None:
+            return self._tokens, self._updated
+        fh.seek(0)
+        content = fh.read()
+        if not content:
+            return float(self.burst), time.time()
+        state = json.loads(content)
+        return state['tokens'], state['updated']
+
+    def _write(self, fh, tokens: float, updated: float):
+        if fh is None:
+            self._tokens, self._updated = tokens, updated
+            return
+        fh.seek(0)
+        fh.truncate()
+        fh.write(json.dumps({'tokens': tokens, 'updated': updated}))
+        fh.flush()
+
+    def _update(self, f) -> float:
+        """
+        Run f(tokens) -> (tokens, wait) on the refilled bucket while holding the locks.
+
+        :return: seconds to wait before a token is available, 0 if one was taken
+        """
+        with self._lock:
+            fh = None
+            if self.path is not None:
+                fh = open(self.path, 'a+')
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                tokens, updated = self._read(fh)
+                now = time.time()
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                tokens, wait = f(tokens)
+                self._write(fh, tokens, now)
+                return wait
+            finally:
+                if fh is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+                    fh.close()
+
+    def _try_acquire(self) -> float:
+        def _take(tokens):
+            if tokens >= 1:
+                return tokens - 1, 0
+            return tokens, (1 - tokens) / self.rate
+        return self._update(_take)
+
+    def acquire(self):
+        """
+        Block until a request is allowed.
+        """
+        while (wait := self._try_acquire()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """
+        Wait until a request is allowed without blocking the event loop.
+        """
+        while (wait := self._try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+    def drain(self, seconds: float = 0.0):
+        """
+        Empty the bucket, used after the server signalled too many requests so every worker backs off.
+
+        :param seconds: additionally hold off all requests for this long, for example the Retry-After of the server
+        """
+        self._update(lambda tokens: (min(tokens, -seconds * self.rate), 0))
@@ -0,0 +1,37 @@
+import pandas as pd
+
+# status of a gas day: C confirmed, E estimated, N no data (filtered out)
+STATUS_DTYPE = pd.CategoricalDtype(['C', 'E', 'N'])
+DATETIME_DTYPE = 'datetime64[ns]'
+
+# field name -> dtype of the columns of the AGSI dataframes, in column order
+AGSI_SCHEMA = {
+    'gasInStorage': 'float32',
+    'consumption': 'float32',
+    'consumptionFull': 'float32',
+    'injection': 'float32',
+    'withdrawal': 'float32',
+    'netWithdrawal': 'float32',
+    'workingGasVolume': 'float32',
+    'injectionCapacity': 'float32',
+    'withdrawalCapacity': 'float32',
+    'contractedCapacity': 'float32',
+    'availableCapacity': 'float32',
+    'coveredCapacity': 'float32',
+    'trend': 'float32',
+    'full': 'float32',
+    'status': STATUS_DTYPE,
+    'updatedAt': DATETIME_DTYPE,
+}
+
+# field name -> dtype of the columns of the ALSI dataframes, in column order
+ALSI_SCHEMA = {
+    'inventory': 'float32',
+    'sendOut': 'float32',
+    'dtmi': 'float32',
+    'dtrs': 'float32',
+    'contractedCapacity': 'float32',
+    'availableCapacity': 'float32',
+    'status': STATUS_DTYPE,
+    'updatedAt': DATETIME_DTYPE,
+}
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from .gie import api_type, SCHEMAS
+from .schemas import STATUS_DTYPE
+
+
+class GieStore:
+    """
+    Local columnar store of parsed gas days, one directory per entity with a memory mapped .npy file per column.
+    Every file is laid out by gas day on a fixed calendar, so reading a range only maps the slice of those
+    gas days and no parsing is needed. A fetched mask keeps track of which gas days were requested from the api,
+    gas days within the revision window are never marked as fetched so they are requested again on the next load.
+    """
+
+    def __init__(self, path: str, revision_window: pd.Timedelta | str = '30D'):
+        """
+        :param path: directory in which the entities are stored
+        :param revision_window: gas days more recent than this are considered not final yet
+        """
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.revision_window = pd.Timedelta(revision_window)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(entity) -> str:
+        # same naming as GieSync, enum member names are safe to use in file names
+        return f'{api_type(entity).name}_{type(entity).__name__}_{entity.name}'
+
+    def _dir(self, entity) -> str:
+        return os.path.join(self.path, self._key(entity))
+
+    def _columns(self, entity) -> dict:
+        """
+        :return: file name -> (dtype, fill value) of all the columns of this entity
+        """
+        columns = {c: (dtype, np.nan) for c, dtype in SCHEMAS[api_type(entity)].items()
+                   if c not in ['status', 'updatedAt']}
+        columns['status'] = ('int8', -1)
+        columns['updatedAt'] = ('int64', np.iinfo('int64').min)
+        columns['fetched'] = ('uint8', 0)
+        return columns
+
+    def _meta(self, entity) -> dict | None:
+        path = os.path.join(self._dir(entity), 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _offsets(self, meta: dict, start: pd.Timestamp, end: pd.Timestamp) -> tuple[int, int]:
+        base = pd.Timestamp(meta['start'])
+        return (start.normalize() - base).days, (end.normalize() - base).days + 1
+
+    def _open(self, entity, column: str, mode: str = 'r') -> np.memmap:
+        return np.load(os.path.join(self._dir(entity), f'{column}.npy'), mmap_mode=mode)
+
+    def _extend(self, entity, start: pd.Timestamp, end: pd.Timestamp) -> dict:
+        """
+        Make sure the files cover start till end, the calendar is grown in whole years to rarely copy.
+
+        :return: the metadata of the entity
+        """
+        meta = self._meta(entity)
+        first = pd.Timestamp(year=start.year, month=1, day=1)
+        last = pd.Timestamp(year=end.year, month=12, day=31)
+        if meta is not None:
+            old_first = pd.Timestamp(meta['start'])
+            old_last = old_first + pd.Timedelta(days=meta['days'] - 1)
+            if old_first <= first and last <= old_last:
+                return meta
+            first, last = min(first, old_first), max(last, old_last)
+
+        os.makedirs(self._dir(entity), exist_ok=True)
+        days = (last - first).days + 1
+        for c, (dtype, fill) in self._columns(entity).items():
+            path = os.path.join(self._dir(entity), f'{c}.npy')
+            new = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=dtype, shape=(days,))
+            new[:] = fill
+            if meta is not None:
+                offset = (old_first - first).days
+                new[offset:offset + meta['days']] = self._open(entity, c)
+            new.flush()
+            del new
+            os.replace(path + '.tmp', path)
+
+        meta = {'start': first.strftime('%Y-%m-%d'), 'days': days}
+        with open(os.path.join(self._dir(entity), 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        return meta
+
+    def missing(self, entity, start: pd.Timestamp, end: pd.Timestamp) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        :return: the consecutive spans of gas days between start and end that were not fetched yet
+        """
+        meta = self._meta(entity)
+        days = pd.date_range(start.normalize(), end.normalize(), freq='D')
+        if meta is None:
+            return [(start, end)] if len(days) else []
+        i, j = self._offsets(meta, start, end)
+        fetched = np.zeros(len(days), dtype=bool)
+        # part of the range can be outside of the calendar of the files
+        lo, hi = max(i, 0), min(j, meta['days'])
+        if lo < hi:
+            fetched[lo - i:hi - i] = self._open(entity, 'fetched')[lo:hi] == 1
+        # boundaries of the runs of missing gas days
+        edges = np.flatnonzero(np.diff(np.concatenate([[1], fetched.view('int8'), [1]])))
+        return [(days[a], days[b - 1]) for a, b in zip(edges[::2], edges[1::2])]
+
+    def write(self, entity, start: pd.Timestamp, end: pd.Timestamp, df: pd.DataFrame | None):
+        """
+        Store the result of fetching start till end, gas days in this span that are not in df are stored as empty.
+
+        :param df: dataframe as returned by GiePandasClient, None if the api had no data
+        """
+        with self._lock:
+            meta = self._extend(entity, start, end)
+            i, j = self._offsets(meta, start, end)
+            positions = None if df is None else (df.index.normalize() - pd.Timestamp(meta['start'])).days.to_numpy()
+            for c, (dtype, fill) in self._columns(entity).items():
+                values = self._open(entity, c, mode='r+')
+                if c == 'fetched':
+                    final = (pd.Timestamp.now().normalize() - self.revision_window - pd.Timestamp(meta['start'])).days
+                    values[i:min(j, max(final, i))] = 1
+                else:
+                    values[i:j] = fill
+                    if df is not None and c == 'status':
+                        values[positions] = df['status'].cat.codes.to_numpy()
+                    elif df is not None and c == 'updatedAt':
+                        values[positions] = df['updatedAt'].to_numpy().astype('datetime64[ns]').view('int64')
+                    elif df is not None and c in df:
+                        values[positions] = df[c].to_numpy()
+                values.flush()
+                del values
+
+    def read(self, entity, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """
+        :return: dataframe of the stored gas days between start and end in the same format as GiePandasClient,
+            most recent gas day first. Only a range of final gas days is a view on the files, gas days that can
+            still be written (inside the revision window or not fetched yet) are copied so the frame does not
+            change under the caller on the next write
+        """
+        t = api_type(entity)
+        meta = self._meta(entity)
+        if meta is None:
+            return pd.DataFrame(columns=list(SCHEMAS[t])).rename_axis('gasDayStart')
+        i, j = self._offsets(meta, start, end)
+        i, j = max(i, 0), max(min(j, meta['days']), 0)
+
+        final = bool(self._open(entity, 'fetched')[i:j].all())
+
+        def _column(c):
+            # only the requested slice is read from the mapped files, newest first like the api
+            values = self._open(entity, c)[i:j][::-1]
+            return values if final else np.array(values)
+
+        status = _column('status')
+        has_data = status >= 0
+        # without gaps the columns stay views on the mapped files
+        rows = slice(None) if has_data.all() else has_data
+        index = pd.DatetimeIndex(
+            (np.datetime64(meta['start'], 'D') + np.arange(i, j)[::-1][rows]).astype('datetime64[ns]'),
+            name='gasDayStart'
+        )
+        columns = {}
+        for c in SCHEMAS[t]:
+            if c == 'status':
+                columns[c] = pd.Categorical.from_codes(status[rows], dtype=STATUS_DTYPE)
+            elif c == 'updatedAt':
+                columns[c] = _column(c)[rows].view('datetime64[ns]')
+            else:
+                columns[c] = _column(c)[rows]
+        return pd.DataFrame(columns, index=index, copy=False)
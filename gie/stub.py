@@ -0,0 +1,209 @@
+import functools
+import gzip
+import hashlib
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+import pandas as pd
+from .gie import APIType, SCHEMAS
+
+
+def _value(r: random.Random) -> str:
+    # numbers come as decimal strings, with the occasional '-' for missing
+    return '-' if r.random() < 0.02 else f'{r.random() * 1000:.2f}'
+
+
+def stub_record(t: APIType, code: str, gas_day: str) -> dict:
+    """
+    Deterministic synthetic record in the format of the api, the same entity and gas day always give the same values.
+    """
+    r = random.Random(f'{t.name}{code}{gas_day}')
+    record = {
+        'name': code,
+        'code': code,
+        'url': code,
+        'gasDayStart': gas_day,
+    }
+    for c in SCHEMAS[t]:
+        if c in ['inventory', 'dtmi']:
+            record[c] = {'unit': '10^3 m^3', 'lng': _value(r), 'gwh': _value(r)}
+        elif c not in ['status', 'updatedAt']:
+            record[c] = _value(r)
+    record['status'] = 'C' if r.random() < 0.9 else 'E'
+    record['info'] = []
+    record['updatedAt'] = f'{gas_day} 18:30:00'
+    return record
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive, so connection pooling of the clients is exercised like against the real api
+    protocol_version = 'HTTP/1.1'
+    server: 'StubServer'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict | None = None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        t = {'/agsi/api': APIType.AGSI, '/alsi/api': APIType.ALSI}.get(url.path)
+        status, body, headers = self.server.respond(t, dict(parse_qsl(url.query)), self.headers)
+        self._send(status, body, headers)
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the agsi and alsi apis that follows their paging contract (from, till, size, page and
+    last_page) on deterministic synthetic records, with configurable latency and injected errors.
+    Meant for benchmarking and testing the clients without network, point a client at it with its endpoints.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, retry_after: int | None = None, history_start: str = '2011-01-01',
+                 max_size: int | None = None, row_latency: float = 0.0, cached_pages: int = 2048,
+                 etags: bool = True, compress: bool = False, seed: int = 0, port: int = 0):
+        """
+        :param latency: seconds every response is delayed
+        :param jitter: maximum random seconds added to the latency
+        :param error_rate: fraction of the requests that is answered with error_status instead of data
+        :param error_status: http status of the injected errors, for example 503 or 429
+        :param retry_after: Retry-After header sent along with the injected errors
+        :param history_start: first gas day for which there is data
+        :param max_size: largest page size that is accepted, larger ones are answered with 400
+        :param row_latency: seconds added to the latency per record on the page, so large pages are slower
+        :param cached_pages: number of generated pages that are kept, so on repeated runs of a benchmark
+            the stub itself is not the bottleneck
+        :param etags: send an ETag with every page and answer 304 to requests with a matching If-None-Match
+        :param compress: gzip the pages for clients that accept it, like the api does
+        :param seed: seed of the random generator for jitter and errors, so runs are reproducible
+        :param port: port to listen on, by default a free one is picked
+        """
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.history_start = pd.Timestamp(history_start)
+        self.max_size = max_size
+        self.row_latency = row_latency
+        self.etags = etags
+        self.compress = compress
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self._random = random.Random(seed)
+        self._page = functools.lru_cache(maxsize=cached_pages)(self._make_page)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def endpoints(self) -> dict:
+        """
+        :return: api type -> url of the emulated api, to pass as endpoints to a client
+        """
+        return {
+            APIType.AGSI: self.url + '/agsi/api',
+            APIType.ALSI: self.url + '/alsi/api',
+        }
+
+    def start(self) -> 'StubServer':
+        """
+        Serve requests from a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # clients that timed out close the connection before the response is written
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, t: APIType | None, params: dict, headers: dict | None = None) -> tuple[int, bytes, dict]:
+        """
+        :param headers: request headers, for conditional requests and compression
+        :return: status, body and extra headers of the response to a request with these query parameters
+        """
+        headers = headers or {}
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.random() * self.jitter
+            error = self._random.random() < self.error_rate
+            if error:
+                self.errors += 1
+
+        if t is None:
+            time.sleep(delay)
+            return 404, b'{"error": "not found"}', {}
+        if error:
+            time.sleep(delay)
+            headers = {} if self.retry_after is None else {'Retry-After': str(self.retry_after)}
+            return self.error_status, b'{"error": "injected"}', headers
+        try:
+            start = max(pd.Timestamp(params['from']), self.history_start)
+            end = pd.Timestamp(params['till'])
+            size = int(params.get('size', 30))
+            page = int(params.get('page', 1))
+        except (KeyError, ValueError):
+            time.sleep(delay)
+            return 400, b'{"error": "invalid parameters"}', {}
+        if self.max_size is not None and size > self.max_size:
+            time.sleep(delay)
+            return 400, b'{"error": "size too large"}', {}
+        code = params.get('facility') or params.get('company') or params.get('country') or 'EU'
+
+        rows, body, etag = self._page(t, code, start, end, size, page)
+        if self.etags and headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified += 1
+            time.sleep(delay)
+            return 304, b'', {'ETag': etag}
+        time.sleep(delay + self.row_latency * rows)
+        extra = {'ETag': etag} if self.etags else {}
+        if self.compress and 'gzip' in headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=1)
+            extra['Content-Encoding'] = 'gzip'
+        return 200, body, extra
+
+    def _make_page(self, t: APIType, code: str, start: pd.Timestamp, end: pd.Timestamp,
+                   size: int, page: int) -> tuple[int, bytes, str]:
+        # most recent gas day first, like the api
+        days = pd.date_range(start, end, freq='D')[::-1].strftime('%Y-%m-%d') if start <= end else []
+        data = [stub_record(t, code, x) for x in days[(page - 1) * size:page * size]]
+        body = {
+            'last_page': max(1, math.ceil(len(days) / size)),
+            'total': len(days),
+            'data': data,
+        }
+        body = json.dumps(body).encode()
+        return len(data), body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import pandas as pd
+from .exceptions import *
+from .gie import GiePandasClient, api_type
+
+
+class GieSync:
+    """
+    Incremental synchronisation of entities into a local dataset.
+
+    Per entity a high water mark of the latest gas day and updatedAt is kept. A sync only requests the trailing
+    revision window before that mark, upserts the rows that are new or have a newer updatedAt into the local
+    dataset and returns just those rows.
+    """
+
+    def __init__(self, client: GiePandasClient, path: str,
+                 revision_window: pd.Timedelta | str = '30D', start: pd.Timestamp | str = '2011-01-01'):
+        """
+        :param client: client used to fetch the data
+        :param path: directory in which the datasets and high water marks are stored
+        :param revision_window: how far before the high water mark to refetch to catch revised gas days
+        :param start: first gas day to fetch for entities that were never synced before
+        """
+        os.makedirs(path, exist_ok=True)
+        self.client = client
+        self.path = path
+        self.revision_window = pd.Timedelta(revision_window)
+        self.start = pd.Timestamp(start)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(entity) -> str:
+        # enum member names are safe to use in file names, codes like GB* are not
+        return f'{api_type(entity).name}_{type(entity).__name__}_{entity.name}'
+
+    def _state_path(self) -> str:
+        return os.path.join(self.path, 'state.json')
+
+    def _data_path(self, entity) -> str:
+        return os.path.join(self.path, f'{self._key(entity)}.pkl')
+
+    def _read_state(self) -> dict:
+        if not os.path.exists(self._state_path()):
+            return {}
+        with open(self._state_path()) as f:
+            return json.load(f)
+
+    def high_water_mark(self, entity) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+        """
+        :return: tuple of the latest synced gas day and the latest updatedAt, None if never synced
+        """
+        state = self._read_state().get(self._key(entity))
+        if state is None:
+            return None
+        return pd.Timestamp(state['gas_day']), pd.Timestamp(state['updated_at'])
+
+    def load(self, entity) -> pd.DataFrame:
+        """
+        :return: the locally stored dataset of this entity, empty if never synced
+        """
+        if not os.path.exists(self._data_path(entity)):
+            return pd.DataFrame()
+        return pd.read_pickle(self._data_path(entity))
+
+    def sync(self, entity, end: pd.Timestamp | str | None = None) -> pd.DataFrame:
+        """
+        Fetch everything since the high water mark of this entity minus the revision window and merge it
+        into the local dataset.
+
+        :param entity: enum member of the entity to sync, for example AGSIStorage.ugs_norg_langelo
+        :param end: last gas day to sync, defaults to today
+        :return: the rows that were new or changed
+        """
+        end = pd.Timestamp.now().normalize() if end is None else pd.Timestamp(end)
+        mark = self.high_water_mark(entity)
+        start = self.start if mark is None else mark[0] - self.revision_window
+
+        try:
+            t = api_type(entity)
+            new = self.client._parse(self.client._fetch(entity, t, start=start, end=end), t=t, entity=entity)
+        except NoMatchingDataError:
+            return pd.DataFrame()
+
+        existing = self.load(entity)
+        if len(existing):
+            changed = new.loc[existing['updatedAt'].reindex(new.index) != new['updatedAt']]
+            merged = pd.concat([existing.drop(index=changed.index, errors='ignore'), changed])
+        else:
+            changed = new
+            merged = new
+        if len(changed) == 0:
+            return changed
+        merged = merged.sort_index(ascending=False)
+        merged.to_pickle(self._data_path(entity))
+
+        with self._lock:
+            state = self._read_state()
+            state[self._key(entity)] = {
+                'gas_day': merged.index.max().isoformat(),
+                'updated_at': merged['updatedAt'].max().isoformat()
+            }
+            with open(self._state_path(), 'w') as f:
+                json.dump(state, f, indent=2)
+
+        return changed
@@ -0,0 +1,146 @@
+import socket
+import threading
+import time
+from types import SimpleNamespace
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter, Retry
+from requests.structures import CaseInsensitiveDict
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import RequestHistory
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# tcp keep-alive so idle pooled connections are not silently dropped between queries
+KEEPALIVE_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    :return: seconds to wait from a Retry-After header, which is either a number of seconds or a http date
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (pd.Timestamp(value) - pd.Timestamp.now(tz='UTC')).total_seconds())
+    except ValueError:
+        return None
+
+
+class ServerRetry(Retry):
+    """
+    Retry that leaves 429 to the client, urllib3 would otherwise retry every response with a Retry-After header.
+    """
+    RETRY_AFTER_STATUS_CODES = frozenset({503})
+
+
+class PoolAdapter(HTTPAdapter):
+    """
+    HTTPAdapter with tcp keep-alive on its pooled connections that can report how well connections are reused.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault('socket_options', KEEPALIVE_SOCKET_OPTIONS)
+        super().init_poolmanager(*args, **kwargs)
+
+    def stats(self) -> dict:
+        """
+        :return: host -> number of connections opened and requests made over them
+        """
+        stats = {}
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is not None:
+                stats[pool.host] = {'connections': pool.num_connections, 'requests': pool.num_requests}
+        return stats
+
+
+class Http2Adapter(BaseAdapter):
+    """
+    Transport adapter that sends the requests of a requests session over httpx with http/2, so the concurrent
+    page requests of a client are multiplexed over one connection per host instead of one connection each.
+    Retries follow the same Retry settings as the HTTPAdapter of the client.
+    """
+
+    def __init__(self, max_retries: Retry | None = None, max_connections: int = 10):
+        if httpx is None:
+            raise ImportError('http2 requires httpx, install it with pip install gie-py[http2]')
+        super().__init__()
+        self.max_retries = max_retries if max_retries is not None else Retry(0)
+        self.client = httpx.Client(http2=True, limits=httpx.Limits(max_connections=max_connections))
+        self._lock = threading.Lock()
+        self._streams = {}
+        self._requests = {}
+
+    @staticmethod
+    def _timeout(timeout) -> 'httpx.Timeout':
+        if isinstance(timeout, tuple):
+            return httpx.Timeout(None, connect=timeout[0], read=timeout[1])
+        return httpx.Timeout(timeout)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        retries = self.max_retries
+        history = []
+        while True:
+            error = None
+            try:
+                r = self.client.request(request.method, request.url, headers=dict(request.headers),
+                                        content=request.body, timeout=self._timeout(timeout))
+            except httpx.TransportError as e:
+                error = e
+                r = None
+            status = None if r is None else r.status_code
+
+            retry = len(history) < retries.total and (
+                error is not None or
+                (status in (retries.status_forcelist or ()) and request.method in retries.allowed_methods)
+            )
+            if not retry:
+                break
+            history.append(RequestHistory(request.method, request.url, error, status, None))
+            # like urllib3: the Retry-After of any retried response, otherwise no sleep before the first retry
+            # and exponential backoff after that
+            retry_after = None if r is None or not retries.respect_retry_after_header else \
+                parse_retry_after(r.headers.get('Retry-After'))
+            if retry_after is None:
+                retry_after = 0 if len(history) <= 1 else retries.backoff_factor * (2 ** (len(history) - 1))
+            time.sleep(retry_after)
+
+        if error is not None:
+            raise requests.ConnectionError(error, request=request)
+
+        with self._lock:
+            host = r.url.host
+            self._requests[host] = self._requests.get(host, 0) + 1
+            # every connection has its own network stream, which is shared by all http/2 streams on it
+            self._streams.setdefault(host, set()).add(id(r.extensions.get('network_stream')))
+
+        response = requests.Response()
+        response.status_code = r.status_code
+        response.headers = CaseInsensitiveDict(r.headers)
+        response._content = r.content
+        response.url = str(r.url)
+        response.reason = r.reason_phrase
+        response.encoding = r.encoding
+        response.request = request
+        # retries like the urllib3 response, so the client can see throttled attempts
+        response.raw = SimpleNamespace(retries=retries.new(history=tuple(history)), version=r.http_version,
+                                       tell=lambda: r.num_bytes_downloaded)
+        return response
+
+    def stats(self) -> dict:
+        """
+        :return: host -> number of connections used and requests made over them
+        """
+        with self._lock:
+            return {host: {'connections': len(self._streams[host]), 'requests': n} for host, n in self._requests.items()}
+
+    def close(self):
+        self.client.close()
@@ -58,13 +58,22 @@ setup(
 
     # You can just specify the packages manually here if your project is
     # simple. Or you can use find_packages().
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks']),
 
 
     # List run-time dependencies here.  These will be installed by pip when
     # your project is installed.
     install_requires=['requests', 'pandas'],
 
+    # Optional dependencies, installed with pip install gie-py[<extra>]
+    extras_require={
+        'async': ['aiohttp'],
+        'arrow': ['pyarrow'],
+        'fast': ['orjson'],
+        'http2': ['httpx[http2]'],
+        'compress': ['brotli'],
+    },
+
     # If there are data files included in your packages that need to be
     # installed, specify them here.  If using Python 2.6 or less, then these
     # have to be included in MANIFEST.in as well.